@@ -1,4 +1,7 @@
-from .lilypond import create_lilypond_file
-from .midi import create_midi_file
-from .audio import create_wav_file, create_mp3_file
+from .lilypond import (create_lilypond_file, create_multistaff_lilypond_file,
+                       render_lilypond)
+from .midi import create_midi_file, create_multitrack_midi_file
+from .audio import create_wav_file, create_mp3_file, render_wav, render_mp3
 from .graphic import create_png_file
+from .batch import render_batch
+from .synth import Synthesizer
@@ -0,0 +1,100 @@
+import asyncio
+import contextlib
+import os
+import shutil
+import subprocess
+import tempfile
+import weakref
+
+from . import audio, graphic
+from notehole.util import memory_filepath
+
+DEFAULT_CONCURRENCY = 4
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def default_semaphore():
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(DEFAULT_CONCURRENCY)
+    return _semaphores[loop]
+
+
+async def create_wav_file(score, filename, semaphore=None):
+    async with semaphore or default_semaphore():
+        with memory_filepath(audio.midi_bytes(score)) as (filepath, fds):
+            cmd = audio.wav_command(filepath, filename)
+            with _removed_on_error(filename):
+                await _run([(cmd, {'pass_fds': fds})])
+
+
+async def create_mp3_file(score, filename, semaphore=None):
+    async with semaphore or default_semaphore():
+        with memory_filepath(audio.midi_bytes(score)) as (filepath, fds):
+            pipe = list(os.pipe())
+            read_fd, write_fd = pipe
+
+            def close_pipe():
+                # the children hold their own copies once they are started
+                while pipe:
+                    os.close(pipe.pop())
+
+            try:
+                with _removed_on_error(filename), \
+                        open(filename, 'wb') as output:
+                    await _run([
+                        (audio.synth_command(filepath),
+                         {'stdout': write_fd, 'pass_fds': fds}),
+                        (audio.encoder_command(),
+                         {'stdin': read_fd, 'stdout': output}),
+                    ], before_wait=close_pipe)
+            finally:
+                close_pipe()
+
+
+async def create_png_file(score, filename, semaphore=None):
+    async with semaphore or default_semaphore():
+        directory = tempfile.mkdtemp()
+        try:
+            ly_filepath, png_filepath = graphic.prepare_png(score, directory)
+            await _run([(graphic.png_command(ly_filepath, png_filepath), {})])
+            shutil.move(png_filepath + '.png', filename)
+        finally:
+            shutil.rmtree(directory)
+
+
+@contextlib.contextmanager
+def _removed_on_error(filename):
+    # a failed or cancelled run leaves no partial output behind
+    try:
+        yield
+    except BaseException:
+        if os.path.exists(filename):
+            os.remove(filename)
+        raise
+
+
+async def _run(commands, before_wait=None):
+    # starts every command, then waits for all of them. If anything fails or
+    # the task is cancelled, the children still running are killed.
+    processes = []
+    try:
+        for cmd, kwargs in commands:
+            process = await asyncio.create_subprocess_exec(*cmd, **kwargs)
+            processes.append((process, cmd))
+        if before_wait:
+            before_wait()
+        for process, _ in processes:
+            await process.wait()
+    except BaseException:
+        for process, _ in processes:
+            if process.returncode is None:
+                process.kill()
+        for process, _ in processes:
+            await process.wait()
+        raise
+
+    for process, cmd in reversed(processes):
+        if process.returncode:
+            raise subprocess.CalledProcessError(process.returncode, cmd)
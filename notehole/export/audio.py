@@ -1,23 +1,133 @@
-import os
+import io
 import subprocess
+import sys
+import wave
 
-from .midi import create_midi_file
-from notehole.util import tmp_filepath
+from .midi import MidiEncoder
+from notehole.util import memory_filepath
 
 SOUNDFONT_PATH = '/usr/share/soundfonts/FluidR3_GM2-2.sf2'
 DEFAULT_BITRATE = 96
 
-def create_wav_file(score, filename):
-    with tmp_filepath() as filepath:
-        create_midi_file(score, filepath)
-        cmd = ['fluidsynth', SOUNDFONT_PATH, filepath, '-F', filename]
-        subprocess.check_call(cmd)
+SAMPLE_RATE = 44100
+CHANNELS = 2
+SAMPLE_WIDTH = 2
+CHUNK_SIZE = 64 * 1024
+
+def create_wav_file(score, filename, synthesizer=None):
+    # a Synthesizer renders in-process, otherwise fluidsynth does
+    if synthesizer is not None:
+        with open(filename, 'wb') as f:
+            write_wav(score, f, synthesizer)
+        return
+    with memory_filepath(midi_bytes(score)) as (filepath, fds):
+        subprocess.check_call(wav_command(filepath, filename), pass_fds=fds)
 
 
 def create_mp3_file(score, filename):
-    with tmp_filepath() as filepath:
-        create_wav_file(score, filepath)
-        cmd = ['lame', '-b', str(DEFAULT_BITRATE), '-f', filepath, filename]
-        subprocess.check_call(cmd)
+    with open(filename, 'wb') as f:
+        write_mp3(score, f)
+
+
+def render_wav(score, synthesizer=None):
+    output = io.BytesIO()
+    write_wav(score, output, synthesizer)
+    return output.getvalue()
+
+
+def render_mp3(score):
+    output = io.BytesIO()
+    write_mp3(score, output)
+    return output.getvalue()
+
+
+def midi_bytes(score):
+    encoder = MidiEncoder()
+    encoder.append(score)
+    return encoder.to_bytes()
+
+
+def wav_command(filepath, filename):
+    return ['fluidsynth', SOUNDFONT_PATH, filepath, '-F', filename]
+
+
+def synth_command(filepath):
+    return ['fluidsynth', '-q', '-T', 'raw', '-r', str(SAMPLE_RATE),
+            '-F', '/dev/stdout', SOUNDFONT_PATH, filepath]
+
+
+def encoder_command():
+    endian = '--little-endian' if sys.byteorder == 'little' else '--big-endian'
+    return ['lame', '-r', '-s', str(SAMPLE_RATE / 1000),
+            '--bitwidth', str(SAMPLE_WIDTH * 8), '--signed', endian,
+            '-b', str(DEFAULT_BITRATE), '-f', '-', '-']
+
+
+def write_wav(score, fileobj, synthesizer=None):
+    frame_size = CHANNELS * SAMPLE_WIDTH
+    if synthesizer is not None:
+        sample_rate = synthesizer.sample_rate
+        chunks = synthesizer.stream(score)
+    else:
+        sample_rate = SAMPLE_RATE
+        chunks = stream_pcm(score)
+
+    with wave.open(fileobj, 'wb') as output:
+        output.setnchannels(CHANNELS)
+        output.setsampwidth(SAMPLE_WIDTH)
+        output.setframerate(sample_rate)
+
+        remainder = b''
+        for chunk in chunks:
+            chunk = remainder + chunk
+            end = len(chunk) - len(chunk) % frame_size
+            output.writeframesraw(chunk[:end])
+            remainder = chunk[end:]
+
+
+def stream_pcm(score):
+    with memory_filepath(midi_bytes(score)) as (filepath, fds):
+        cmd = synth_command(filepath)
+        synth = subprocess.Popen(cmd, stdout=subprocess.PIPE, pass_fds=fds)
+        with _supervise(synth):
+            yield from iter(lambda: synth.stdout.read(CHUNK_SIZE), b'')
+        _check(synth, cmd)
+
+
+def write_mp3(score, fileobj):
+    with memory_filepath(midi_bytes(score)) as (filepath, fds):
+        synth_cmd = synth_command(filepath)
+        synth = subprocess.Popen(synth_cmd, stdout=subprocess.PIPE,
+                                 pass_fds=fds)
+        with _supervise(synth):
+            cmd = encoder_command()
+            encoder = subprocess.Popen(cmd, stdin=synth.stdout,
+                                       stdout=subprocess.PIPE)
+            # only the encoder holds the read end now, so the synthesizer
+            # blocks when the encoder falls behind and fails if it exits
+            synth.stdout.close()
+            with _supervise(encoder):
+                for chunk in iter(lambda: encoder.stdout.read(CHUNK_SIZE), b''):
+                    fileobj.write(chunk)
+            _check(encoder, cmd)
+        _check(synth, synth_cmd)
+
+
+class _supervise(object):
+
+    def __init__(self, process):
+        self.process = process
+
+    def __enter__(self):
+        return self.process
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.process.kill()
+        self.process.stdout.close()
+        self.process.wait()
 
 
+def _check(process, cmd):
+    if process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, cmd)
@@ -0,0 +1,68 @@
+import os
+
+from concurrent.futures import ProcessPoolExecutor
+
+from notehole.util import bounded_submit
+from .lilypond import create_lilypond_file
+from .midi import create_midi_file
+from .audio import create_wav_file, create_mp3_file
+from .graphic import create_png_file
+
+EXPORTERS = {
+    'ly': create_lilypond_file,
+    'mid': create_midi_file,
+    'wav': create_wav_file,
+    'mp3': create_mp3_file,
+    'png': create_png_file,
+}
+
+FILENAME = '{index}.{format}'
+
+
+def render_batch(scores, formats, directory, workers=None, progress=None,
+                 filename=FILENAME):
+    workers = workers or os.cpu_count() or 1
+    for fmt in formats:
+        if fmt not in EXPORTERS:
+            raise ValueError('unknown format {}'.format(fmt))
+
+    jobs = ((index, fmt, score,
+             os.path.join(directory, filename.format(index=index, format=fmt)))
+            for index, score in enumerate(scores)
+            for fmt in formats)
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # at most two jobs per worker queued, reported as they complete
+        done = bounded_submit(executor, _render, jobs, workers * 2,
+                              ordered=False)
+        for (index, fmt, _, filepath), future in done:
+            result = RenderResult(index, fmt, filepath, future.exception())
+            results.append(result)
+            if progress:
+                progress(len(results), result)
+
+    return sorted(results, key=lambda r: (r.index, formats.index(r.format)))
+
+
+def _render(job):
+    _, fmt, score, filepath = job
+    EXPORTERS[fmt](score, filepath)
+
+
+class RenderResult(object):
+
+    def __init__(self, index, format, filename, error=None):
+        self.index = index
+        self.format = format
+        self.filename = filename
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = 'ok' if self.ok else repr(self.error)
+        return "<RenderResult {} {} {}: {}>".format(self.index, self.format,
+                                                     self.filename, status)
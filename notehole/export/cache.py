@@ -0,0 +1,153 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from contextlib import contextmanager
+
+from . import audio, graphic
+from .batch import EXPORTERS
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CACHE_VERSION = 2
+DEFAULT_MAX_SIZE = 1024 ** 3
+
+OPTIONS = {
+    'ly': lambda: (),
+    'mid': lambda: (),
+    'png': lambda: (graphic.EXTRA,),
+    'wav': lambda: (audio.SOUNDFONT_PATH,),
+    'mp3': lambda: (audio.SOUNDFONT_PATH, audio.DEFAULT_BITRATE),
+}
+
+
+def score_digest(score):
+    digest = hashlib.sha256()
+    digest.update(repr((score.meter.beats, score.meter.bar, score.tempo))
+                  .encode())
+    for item in score:
+        digest.update(repr(item).encode())
+        digest.update(b'\n')
+    return digest
+
+
+def render_key(score, fmt):
+    digest = score_digest(score)
+    digest.update(repr((CACHE_VERSION, fmt, OPTIONS[fmt]())).encode())
+    return digest.hexdigest()
+
+
+class RenderCache(object):
+
+    LOCK_NAME = '.lock'
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def entry_path(self, key, fmt):
+        return os.path.join(self.directory, key[:2], '{}.{}'.format(key, fmt))
+
+    def path(self, score, fmt):
+        entry = self.entry_path(render_key(score, fmt), fmt)
+        try:
+            os.utime(entry)
+        except FileNotFoundError:
+            self.misses += 1
+            self.store(score, fmt, entry)
+        else:
+            self.hits += 1
+        return entry
+
+    def render(self, score, fmt, filename):
+        entry = self.path(score, fmt)
+        try:
+            shutil.copyfile(entry, filename)
+        except FileNotFoundError:
+            # evicted by another process between lookup and copy
+            self.store(score, fmt, entry)
+            shutil.copyfile(entry, filename)
+
+    def exporter(self, fmt):
+        def create_file(score, filename):
+            self.render(score, fmt, filename)
+        return create_file
+
+    def store(self, score, fmt, entry):
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry),
+                                        suffix='.tmp')
+        os.close(fd)
+        try:
+            EXPORTERS[fmt](score, tmp_path)
+            os.replace(tmp_path, entry)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        self.evict(keep=entry)
+
+    def entries(self):
+        for root, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename == self.LOCK_NAME or filename.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        with self.lock():
+            entries = sorted(self.entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_size:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+    def clear(self):
+        with self.lock():
+            for path, _, _ in list(self.entries()):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    @contextmanager
+    def lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, self.LOCK_NAME), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def stats(self):
+        entries = list(self.entries())
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(entries),
+            'size': sum(size for _, size, _ in entries),
+        }
@@ -1,8 +1,12 @@
 import uuid
 import tempfile
 import os.path
+import queue
 import shutil
 import subprocess
+import threading
+
+from concurrent.futures import Future
 
 from .lilypond import create_lilypond_file
 
@@ -17,16 +21,185 @@ EXTRA = """
 }
 """
 
-def create_png_file(score, filename):
+DEFAULT_WORKERS = 2
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_MAX_JOBS = 256
+
+def create_png_file(score, filename, time=None, measures=None, pool=None):
+    if pool is not None:
+        pool.render(score, filename, time, measures)
+        return
     directory = tempfile.mkdtemp()
+    try:
+        ly_filepath, png_filepath = prepare_png(score, directory, time,
+                                                measures)
+        subprocess.check_call(png_command(ly_filepath, png_filepath))
+        shutil.move(png_filepath + '.png', filename)
+    finally:
+        shutil.rmtree(directory)
+
+
+def prepare_png(score, directory, time=None, measures=None):
     ly_filepath = os.path.join(directory, str(uuid.uuid4()))
     png_filepath = os.path.join(directory, str(uuid.uuid4()))
+    create_lilypond_file(score, ly_filepath, EXTRA, time, measures)
+    return ly_filepath, png_filepath
 
-    create_lilypond_file(score, ly_filepath, EXTRA)
 
-    cmd = ['lilypond', '-dbackend=eps', '-dno-gs-load-fonts',
+def png_command(ly_filepath, png_filepath):
+    return ['lilypond', '-dbackend=eps', '-dno-gs-load-fonts',
             '-dinclude-eps-fonts', '--png', '-o', png_filepath, ly_filepath]
-    subprocess.check_call(cmd)
 
-    shutil.move(png_filepath + '.png', filename)
-    shutil.rmtree(directory)
+
+def batch_png_command(ly_filepaths, directory):
+    # with a directory as output, lilypond names each png after its input
+    return ['lilypond', '-dbackend=eps', '-dno-gs-load-fonts',
+            '-dinclude-eps-fonts', '--png', '-o', directory] + ly_filepaths
+
+
+class PngRenderPool(object):
+    # Worker threads that batch the queued scores into a single lilypond
+    # run, so that its startup is paid once per batch instead of once per
+    # image. Each worker keeps a scratch directory and is replaced by a
+    # fresh one after `max_jobs` scores.
+
+    def __init__(self, workers=DEFAULT_WORKERS, batch_size=DEFAULT_BATCH_SIZE,
+                 max_jobs=DEFAULT_MAX_JOBS):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_jobs = max_jobs
+        self.jobs = queue.Queue()
+        self.threads = []
+        self.lock = threading.Lock()
+        self.closed = False
+        for _ in range(workers):
+            self.spawn()
+
+    def spawn(self):
+        thread = threading.Thread(target=self.work, daemon=True)
+        self.threads = [t for t in self.threads if t.is_alive()] + [thread]
+        thread.start()
+
+    def submit(self, score, filename, time=None, measures=None):
+        future = Future()
+        with self.lock:
+            # under the lock, so no job lands behind the stop markers
+            if self.closed:
+                raise RuntimeError('cannot submit to a closed pool')
+            self.jobs.put((score, filename, time, measures, future))
+        return future
+
+    def render(self, score, filename, time=None, measures=None):
+        return self.submit(score, filename, time, measures).result()
+
+    def exporter(self):
+        def create_file(score, filename):
+            self.render(score, filename)
+        return create_file
+
+    def work(self):
+        directory = tempfile.mkdtemp()
+        done = 0
+        try:
+            while done < self.max_jobs:
+                batch, stop = self.next_batch(self.max_jobs - done)
+                if batch:
+                    self.render_batch_safely(batch, directory)
+                    done += len(batch)
+                if stop:
+                    return
+        finally:
+            shutil.rmtree(directory)
+
+        # replaced even when closing: jobs queued before close() are still
+        # ahead of the stop markers and need a worker
+        with self.lock:
+            self.spawn()
+
+    def next_batch(self, limit):
+        # blocks for the first job, then takes whatever else is queued
+        batch = []
+        job = self.jobs.get()
+        while job is not None:
+            batch.append(job)
+            if len(batch) >= min(self.batch_size, limit):
+                return batch, False
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def render_batch_safely(self, batch, directory):
+        # a batch failing as a whole fails its jobs, not the worker
+        try:
+            self.render_batch(batch, directory)
+        except Exception as e:
+            for job in batch:
+                future = job[-1]
+                if not future.done():
+                    future.set_exception(e)
+
+    def render_batch(self, batch, directory):
+        jobs = []
+        for index, (score, filename, time, measures, future) in \
+                enumerate(batch):
+            if not future.set_running_or_notify_cancel():
+                continue
+            name = os.path.join(directory, str(index))
+            try:
+                create_lilypond_file(score, name + '.ly', EXTRA, time,
+                                     measures)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            jobs.append((name, filename, future))
+
+        if not jobs:
+            return
+        cmd = batch_png_command([name + '.ly' for name, _, _ in jobs],
+                                directory)
+        try:
+            # lilypond carries on past a failing file, the pngs tell which
+            # ones made it
+            returncode = subprocess.call(cmd)
+        except OSError as e:
+            returncode = e
+
+        for name, filename, future in jobs:
+            try:
+                shutil.move(name + '.png', filename)
+            except FileNotFoundError:
+                if isinstance(returncode, OSError):
+                    future.set_exception(returncode)
+                else:
+                    future.set_exception(
+                        subprocess.CalledProcessError(returncode, cmd))
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(filename)
+            finally:
+                if os.path.exists(name + '.ly'):
+                    os.remove(name + '.ly')
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        for _ in range(self.workers):
+            self.jobs.put(None)
+        while True:
+            with self.lock:
+                alive = [t for t in self.threads if t.is_alive()]
+                self.threads = alive
+            if not alive:
+                break
+            alive[0].join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
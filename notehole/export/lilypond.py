@@ -1,4 +1,12 @@
-from notehole.music import Rest, Note, Chord
+import io
+import itertools
+
+from fractions import Fraction
+
+from notehole.music import Rest, Note, Chord, window, shared_timing
+from notehole.operations import Repeated
+from notehole.util import ordered_map
+from . import tables
 
 TEMPLATE = r"""
 \version "2.18.2"
@@ -10,31 +18,70 @@ TEMPLATE = r"""
 {extra}
 """
 
-def create_lilypond_file(score, filename, extra=""):
+# the body is written between these, without building the whole document
+HEADER, FOOTER = TEMPLATE.split('{score}')
+
+STAVES_TEMPLATE = r"""
+\version "2.18.2"
+
+<<
+{staves}
+>>
+
+{extra}
+"""
+
+# the staves are written between these as they are formatted
+STAVES_HEADER, STAVES_FOOTER = STAVES_TEMPLATE.split('{staves}')
+
+STAFF_TEMPLATE = r"""\new Staff \relative {start_tone} {{
+    {score}
+}}"""
+
+def create_lilypond_file(score, filename, extra="", time=None, measures=None):
+    with open(filename, 'w') as f:
+        write_lilypond(score, f, extra, time, measures)
+
+
+def render_lilypond(score, extra="", time=None, measures=None):
+    output = io.StringIO()
+    write_lilypond(score, output, extra, time, measures)
+    return output.getvalue()
+
+
+def write_lilypond(score, fileobj, extra="", time=None, measures=None):
+    writer = LilypondWriter(fileobj)
+    writer.append(window(score, time, measures), extra)
+    writer.close()
+
+
+def create_multistaff_lilypond_file(scores, filename, extra="", workers=None):
+    # one staff per score, played simultaneously; staves are formatted
+    # independently, in parallel when workers allow, and written in order
+    scores = list(scores)
+    shared_timing(scores)
+    if len(scores) == 1:
+        workers = 1
+    with open(filename, 'w') as f:
+        f.write(STAVES_HEADER)
+        for index, staff in enumerate(ordered_map(_format_staff, scores,
+                                                  workers)):
+            f.write('\n' + staff if index else staff)
+        f.write(STAVES_FOOTER.format(extra=extra))
+
+
+def _format_staff(score):
     exporter = LilypondExporter()
-    exporter.append(score, extra)
-    exporter.save(filename)
+    exporter.append(score)
+    return exporter.format_staff()
 
 
 class LilypondExporter(object):
 
-    TONE_SYMBOLS = {
-        0: 'c',
-        1: 'd',
-        2: 'e',
-        3: 'f',
-        4: 'g',
-        5: 'a',
-        6: 'b',
-    }
-
-    ACCIDENTAL_SYMBOLS = {
-        -2: 'eses',
-        -1: 'es',
-        0: '',
-        1: 'is',
-        2: 'isis',
-    }
+    TONE_SYMBOLS = tables.TONE_SYMBOLS
+    ACCIDENTAL_SYMBOLS = tables.ACCIDENTAL_SYMBOLS
+
+    CHUNK_SIZE = 4096
 
     def __init__(self):
         self.tokens = []
@@ -44,16 +91,61 @@ class LilypondExporter(object):
 
     def append(self, score, extra=""):
         self.find_start_tone(score)
-        self.tokens.append(self.format_meter(score.meter))
-        self.tokens.extend(self.format_item(item) for item in score)
+        self.add_tokens([self.format_meter(score.meter)])
+        partial = self.format_partial(score)
+        if partial:
+            self.add_tokens([partial])
+        items = getattr(score, 'items', score)
+        if isinstance(items, Repeated):
+            self.add_tokens(self.format_blocks(items))
+        else:
+            self.add_tokens(self.format_item(item) for item in score)
         self.extra += extra
 
+    def add_tokens(self, tokens):
+        self.tokens.extend(tokens)
+
+    def format_blocks(self, repeated):
+        # only the first tone of a block depends on the tone before it, so a
+        # block is formatted once and that token is cached per entry tone
+        formatted = {}
+        entries = {}
+        for block in repeated.order:
+            if block not in formatted:
+                formatted[block] = self.format_block(repeated.blocks[block])
+            first, tokens, exit_tone = formatted[block]
+            if first is None:
+                yield from tokens
+                continue
+
+            key = (block, self.last_tone)
+            if key not in entries:
+                entries[key] = self.format_item(repeated.blocks[block][first])
+            yield from tokens[:first]
+            yield entries[key]
+            yield from tokens[first + 1:]
+            self.last_tone = exit_tone
+
+    def format_block(self, block):
+        entry_tone = self.last_tone
+        tokens = [self.format_item(item) for item in block]
+        first = next((index for index, item in enumerate(block)
+                      if not isinstance(item, Rest)), None)
+        exit_tone = self.last_tone
+        self.last_tone = entry_tone
+        return first, tokens, exit_tone
+
     def find_start_tone(self, score):
         if self.start_tone:
             return
 
+        # an excerpt continues from the tone sounding before it, so that its
+        # octave marks are the same as in the full score
         item_filter = lambda x: isinstance(x, (Note, Chord))
-        item = next(filter(item_filter, score))
+        preceding = getattr(score, 'preceding', tuple)()
+        item = next(filter(item_filter, preceding), None)
+        if item is None:
+            item = next(filter(item_filter, score))
 
         if isinstance(item, Note):
             self.start_tone = self.last_tone = item.tone
@@ -75,7 +167,7 @@ class LilypondExporter(object):
         return "r{}".format(duration)
 
     def format_duration(self, duration):
-        return "{}{}".format(duration.value, '.' * duration.dots)
+        return tables.lilypond_duration(duration.value, duration.dots)
 
     def format_note(self, note):
         octave = self.last_octave(note.tone)
@@ -84,7 +176,7 @@ class LilypondExporter(object):
         return "{}{}".format(tone, duration)
 
     def last_octave(self, tone):
-        octave = self.relative_octave(tone, self.last_tone)
+        octave = self.relative_octave(self.last_tone, tone)
         self.last_tone = tone
         return octave
 
@@ -98,16 +190,7 @@ class LilypondExporter(object):
         return extra
 
     def format_tone(self, tone, octave=0):
-        return "{}{}{}".format(self.TONE_SYMBOLS[tone.position],
-                               self.ACCIDENTAL_SYMBOLS[tone.accidental],
-                               self.format_octave(octave))
-
-    def format_octave(self, octave):
-        if octave > 0:
-            return "'" * octave
-        elif octave < 0:
-            return ',' * abs(octave)
-        return ''
+        return tables.lilypond_tone(tone.position, tone.accidental, octave)
 
     def format_chord(self, chord):
         tones = chord.sorted_tones()
@@ -125,13 +208,72 @@ class LilypondExporter(object):
     def format_meter(self, meter):
         return "\\time {}/{}".format(meter.beats, meter.bar)
 
-    def save(self, filename):
+    def format_partial(self, score):
+        # pickup for an excerpt starting mid-measure, when lilypond can
+        # express its length
+        offset = getattr(score, 'measure_offset', 0)
+        if not offset:
+            return None
+        pickup = Fraction(score.meter.beats, score.meter.bar) - offset
+        if pickup.denominator & (pickup.denominator - 1):
+            return None
+        return "\\partial {}*{}".format(pickup.denominator, pickup.numerator)
+
+    def format_start_tone(self):
         start_octave = self.start_tone.octave - 3
-        start_tone = self.format_tone(self.start_tone, start_octave)
-        score = ' '.join(self.tokens)
-        rendered = TEMPLATE.format(start_tone=start_tone,
-                                   score=score,
-                                   extra=self.extra)
+        return self.format_tone(self.start_tone, start_octave)
+
+    def format_staff(self):
+        return STAFF_TEMPLATE.format(start_tone=self.format_start_tone(),
+                                     score=' '.join(self.tokens))
+
+    def format_header(self):
+        return HEADER.format(start_tone=self.format_start_tone())
 
+    def format_footer(self):
+        return FOOTER.format(extra=self.extra)
+
+    def write_tokens(self, fileobj, tokens, separate=False):
+        # joins and writes CHUNK_SIZE tokens at a time; `separate` tells
+        # whether tokens were written before. Returns it for the next call.
+        tokens = iter(tokens)
+        while True:
+            chunk = ' '.join(itertools.islice(tokens, self.CHUNK_SIZE))
+            if not chunk:
+                return separate
+            fileobj.write(' ' + chunk if separate else chunk)
+            separate = True
+
+    def write(self, fileobj):
+        fileobj.write(self.format_header())
+        self.write_tokens(fileobj, self.tokens)
+        fileobj.write(self.format_footer())
+
+    def to_string(self):
+        output = io.StringIO()
+        self.write(output)
+        return output.getvalue()
+
+    def save(self, filename):
         with open(filename, 'w') as f:
-            f.write(rendered)
+            self.write(f)
+
+
+class LilypondWriter(LilypondExporter):
+    # writes tokens to `fileobj` as they are formatted instead of keeping
+    # them, the header on the first append and the footer on close()
+
+    def __init__(self, fileobj):
+        super().__init__()
+        self.file = fileobj
+        self.started = False
+        self.separate = False
+
+    def add_tokens(self, tokens):
+        if not self.started:
+            self.file.write(self.format_header())
+            self.started = True
+        self.separate = self.write_tokens(self.file, tokens, self.separate)
+
+    def close(self):
+        self.file.write(self.format_footer())
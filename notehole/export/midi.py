@@ -1,12 +1,91 @@
-from notehole.music import Note, Rest, Chord
-import mido
+import struct
+
+from notehole.music import Note, Rest, Chord, window, shared_timing
+from notehole.operations import Repeated
+from notehole.util import ordered_map
+from . import tables
+
+try:
+    import mido
+except ImportError:
+    mido = None
 
 PIANO = 0
 
-def create_midi_file(score, filename):
-    exporter = MidiExporter()
-    exporter.append(score)
-    exporter.save(filename)
+NOTE_OFF = 0x80
+NOTE_ON = 0x90
+PROGRAM_CHANGE = 0xc0
+VELOCITY = 64
+
+SET_TEMPO = 0x51
+TIME_SIGNATURE = 0x58
+END_OF_TRACK = b'\x00\xff\x2f\x00'
+
+MULTITRACK = 1
+# channel 9 is reserved for percussion
+CHANNELS = tuple(channel for channel in range(16) if channel != 9)
+
+MESSAGE_TYPES = {
+    NOTE_OFF: 'note_off',
+    NOTE_ON: 'note_on',
+}
+
+def create_midi_file(score, filename, stream=False, time=None, measures=None):
+    score = window(score, time, measures)
+    if stream:
+        with open(filename, 'wb') as f:
+            writer = MidiStreamWriter(f)
+            writer.append(score)
+            writer.close()
+        return
+
+    encoder = MidiEncoder()
+    encoder.append(score)
+    encoder.save(filename)
+
+
+def create_multitrack_midi_file(scores, filename, instrument=PIANO,
+                                workers=None):
+    # type 1 file: a conductor track with the tempo and meter, then one track
+    # per score on its own channel. Tracks are encoded independently, in
+    # parallel when workers allow, and written in order.
+    scores = list(scores)
+    meter, tempo = shared_timing(scores)
+    conductor = MidiEncoder()
+    conductor.add_tempo(tempo)
+    conductor.add_time_signature(meter)
+
+    jobs = ((score, CHANNELS[index % len(CHANNELS)], instrument)
+            for index, score in enumerate(scores))
+    if len(scores) == 1:
+        workers = 1
+
+    with open(filename, 'wb') as f:
+        f.write(conductor.header_bytes(len(scores) + 1, MULTITRACK))
+        f.write(conductor.track_bytes())
+        for track in ordered_map(_encode_track, jobs, workers):
+            f.write(track)
+
+
+def _encode_track(job):
+    score, channel, instrument = job
+    encoder = MidiEncoder(instrument, channel=channel)
+    encoder.add_instrument(instrument)
+    encoder.add_score(score)
+    return bytes(encoder.track_bytes())
+
+
+def encode_variable_int(value):
+    encoded = [value & 0x7f]
+    value >>= 7
+    while value:
+        encoded.append(value & 0x7f | 0x80)
+        value >>= 7
+    return bytes(reversed(encoded))
+
+
+def bpm2tempo(bpm):
+    return int(round(60 * 1e6 / bpm))
 
 
 class MidiExporter(object):
@@ -14,18 +93,14 @@ class MidiExporter(object):
     TICK = 24
     FILETYPE = 0
 
-    SEMITONES = {
-        0: 0,
-        1: 2,
-        2: 4,
-        3: 5,
-        4: 7,
-        5: 9,
-        6: 11
-    }
-
-    def __init__(self, instrument=PIANO):
+    SEMITONES = tables.SEMITONES
+
+    def __init__(self, instrument=PIANO, channel=0):
+        if mido is None:
+            raise ImportError('mido is required for MidiExporter, '
+                              'use MidiEncoder instead')
         self.instrument = instrument
+        self.channel = channel
         self.track = mido.MidiTrack()
 
     def append(self, score):
@@ -34,25 +109,34 @@ class MidiExporter(object):
         self.add_instrument(self.instrument)
         self.add_score(score)
 
+    def add_message(self, msg):
+        self.track.append(msg)
+
     def add_tempo(self, tempo):
         msg = mido.MetaMessage('set_tempo', tempo=mido.bpm2tempo(tempo))
-        self.track.append(msg)
+        self.add_message(msg)
 
     def add_time_signature(self, meter):
         msg = mido.MetaMessage('time_signature',
                                numerator=meter.beats,
                                denominator=meter.bar)
-        self.track.append(msg)
+        self.add_message(msg)
 
     def add_instrument(self, instrument):
-        msg = mido.Message('program_change', program=instrument)
-        self.track.append(msg)
+        msg = mido.Message('program_change', program=instrument,
+                           channel=self.channel)
+        self.add_message(msg)
 
     def add_score(self, score):
         self.track.extend(self.map_score(score))
 
     def map_score(self, score):
-        ticks = 0
+        for status, midi_note, ticks in self.map_events(score):
+            yield mido.Message(MESSAGE_TYPES[status], note=midi_note, time=ticks,
+                               channel=self.channel)
+
+    def map_events(self, score):
+        ticks = self.lead_ticks(score)
         for item in score:
             if isinstance(item, Rest):
                 ticks += self.duration_to_ticks(item.duration)
@@ -65,39 +149,242 @@ class MidiExporter(object):
             else:
                 raise Exception('unknown item {}'.format(item))
 
+    def lead_ticks(self, score):
+        # an excerpt starting mid-measure keeps its place in the bar
+        offset = getattr(score, 'measure_offset', 0)
+        return int(offset * self.TICK * 4)
+
     def map_note(self, note, rest_ticks=0):
         midi_note = self.tone_to_midi(note.tone)
         ticks = self.duration_to_ticks(note.duration)
-        yield mido.Message('note_on', note=midi_note, time=rest_ticks)
-        yield mido.Message('note_off', note=midi_note, time=ticks)
+        yield NOTE_ON, midi_note, rest_ticks
+        yield NOTE_OFF, midi_note, ticks
 
     def tone_to_midi(self, tone):
-        return (
-            (tone.octave + 1) * 12 +
-            self.SEMITONES[tone.position] + tone.accidental
-        )
+        return tables.midi_note(tone.pitch, tone.accidental)
 
     def duration_to_ticks(self, duration):
-        values = [duration.value] + [duration.value * (2**(i+1))
-                                     for i in range(duration.dots)]
-        ticks = sum(int(self.TICK / (v / 4)) for v in values)
-        return ticks
+        return tables.duration_ticks(duration.value, duration.dots, self.TICK)
 
     def map_chord(self, chord, rest_ticks=0):
         notes = [self.tone_to_midi(t) for t in chord.sorted_tones()]
         ticks = self.duration_to_ticks(chord.duration)
 
-        yield mido.Message('note_on', note=notes[0], time=rest_ticks)
+        yield NOTE_ON, notes[0], rest_ticks
 
         for midi_note in notes[1:]:
-            yield mido.Message('note_on', note=midi_note, time=0)
+            yield NOTE_ON, midi_note, 0
 
-        yield mido.Message('note_off', note=notes[0], time=ticks)
+        yield NOTE_OFF, notes[0], ticks
 
         for midi_note in notes[1:]:
-            yield mido.Message('note_off', note=midi_note, time=0)
+            yield NOTE_OFF, midi_note, 0
 
     def save(self, filename):
         with mido.MidiFile(type=self.FILETYPE, ticks_per_beat=self.TICK) as mid:
             mid.tracks.append(self.track)
             mid.save(filename)
+
+
+class MidiEncoder(MidiExporter):
+
+    EVENT_SIZE = 4
+
+    limit = None
+
+    def __init__(self, instrument=PIANO, size_hint=1024, channel=0):
+        self.instrument = instrument
+        self.channel = channel
+        self.data = bytearray(size_hint)
+        self.position = 0
+        self.running_status = None
+
+    def reserve(self, size):
+        missing = self.position + size - len(self.data)
+        if missing > 0:
+            self.data.extend(bytes(max(missing, len(self.data))))
+
+    def write(self, chunk):
+        end = self.position + len(chunk)
+        if end > len(self.data):
+            self.reserve(len(chunk))
+        self.data[self.position:end] = chunk
+        self.position = end
+
+    def add_meta(self, meta_type, payload):
+        self.write(b'\x00\xff' + bytes((meta_type,)) +
+                   encode_variable_int(len(payload)) + payload)
+        self.running_status = None
+
+    def add_event(self, ticks, status, *data):
+        if any(not 0 <= byte <= 127 for byte in data):
+            raise ValueError('data byte must be in range 0..127')
+        if ticks < 0:
+            raise ValueError('message time must be non-negative in MIDI file')
+
+        if status == self.running_status:
+            self.write(encode_variable_int(ticks) + bytes(data))
+        else:
+            self.write(encode_variable_int(ticks) + bytes((status,) + data))
+            self.running_status = status
+
+    def add_tempo(self, tempo):
+        self.add_meta(SET_TEMPO, struct.pack('>L', bpm2tempo(tempo))[1:])
+
+    def add_time_signature(self, meter):
+        exponent = meter.bar.bit_length() - 1
+        if meter.bar != 2 ** exponent:
+            raise ValueError('time signature denominator must be a power of 2')
+        self.add_meta(TIME_SIGNATURE, bytes((meter.beats, exponent, 24, 8)))
+
+    def add_instrument(self, instrument):
+        self.add_event(0, PROGRAM_CHANGE | self.channel, instrument)
+
+    def add_score(self, score):
+        items = getattr(score, 'items', score)
+        if isinstance(items, Repeated):
+            self.add_blocks(items)
+            return
+        # a bounded buffer is flushed instead of grown
+        if hasattr(items, '__len__') and not self.limit:
+            self.reserve(len(items) * self.EVENT_SIZE * 2)
+        self.add_events(self.map_events(score))
+
+    def add_blocks(self, repeated):
+        # each distinct block is encoded once, from its first sounding event
+        # on. Only that event depends on what comes before the block (the
+        # rest ticks carried over and the running status), so it is written
+        # afresh on every repeat and the rest is replayed as bytes.
+        encoded = [self.encode_block(block) for block in repeated.blocks]
+        carried = 0
+        for block in repeated.order:
+            lead, first, body, status, trailing = encoded[block]
+            if first is None:
+                carried += lead
+                continue
+            self.add_events([first + (carried + lead,)])
+            self.write(body)
+            self.running_status = status
+            carried = trailing
+
+    def encode_block(self, block):
+        events = self.map_events(block)
+        first = next(events, None)
+        if first is None:
+            lead = sum(self.duration_to_ticks(item.duration) for item in block)
+            return lead, None, b'', None, 0
+
+        encoder = MidiEncoder(self.instrument, channel=self.channel)
+        encoder.running_status = first[0] | self.channel
+        encoder.add_events(events)
+        body = bytes(encoder.data[:encoder.position])
+
+        trailing = 0
+        for item in reversed(block):
+            if not isinstance(item, Rest):
+                break
+            trailing += self.duration_to_ticks(item.duration)
+        return first[2], first[:2], body, encoder.running_status, trailing
+
+    def add_events(self, events):
+        data = self.data
+        position = self.position
+        running_status = self.running_status
+        channel = self.channel
+
+        for status, midi_note, ticks in events:
+            if not 0 <= midi_note <= 127:
+                raise ValueError('data byte must be in range 0..127')
+
+            status |= channel
+
+            if ticks < 0x80:
+                if status == running_status:
+                    event = bytes((ticks, midi_note, VELOCITY))
+                else:
+                    event = bytes((ticks, status, midi_note, VELOCITY))
+            elif status == running_status:
+                event = encode_variable_int(ticks) + bytes((midi_note, VELOCITY))
+            else:
+                event = (encode_variable_int(ticks) +
+                         bytes((status, midi_note, VELOCITY)))
+            running_status = status
+
+            end = position + len(event)
+            if end > len(data):
+                self.position = position
+                if self.limit:
+                    self.flush()
+                else:
+                    self.reserve(len(event))
+                position = self.position
+                end = position + len(event)
+            data[position:end] = event
+            position = end
+
+            if self.limit and position >= self.limit:
+                self.position = position
+                self.flush()
+                position = self.position
+
+        self.position = position
+        self.running_status = running_status
+
+    def track_bytes(self):
+        track = self.data[:self.position] + END_OF_TRACK
+        return b'MTrk' + struct.pack('>L', len(track)) + track
+
+    def header_bytes(self, tracks=1, filetype=None):
+        filetype = self.FILETYPE if filetype is None else filetype
+        header = struct.pack('>hhh', filetype, tracks, self.TICK)
+        return b'MThd' + struct.pack('>L', len(header)) + header
+
+    def to_bytes(self):
+        return bytes(self.header_bytes() + self.track_bytes())
+
+    def save(self, filename):
+        with open(filename, 'wb') as f:
+            f.write(self.to_bytes())
+
+
+class MidiStreamWriter(MidiEncoder):
+
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self, fileobj, instrument=PIANO):
+        super().__init__(instrument, self.BUFFER_SIZE)
+        self.limit = self.BUFFER_SIZE
+        self.file = fileobj
+        self.length = 0
+        self.write_header()
+
+    def write_header(self):
+        self.file.write(self.header_bytes())
+        self.file.write(b'MTrk')
+        self.length_position = self.file.tell()
+        self.file.write(struct.pack('>L', 0))
+
+    def write(self, chunk):
+        if self.position + len(chunk) > len(self.data):
+            self.flush()
+        if len(chunk) > len(self.data):
+            # a replayed block larger than the buffer goes straight out
+            self.file.write(chunk)
+            self.length += len(chunk)
+            return
+        super().write(chunk)
+        if self.position >= self.limit:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.data[:self.position])
+        self.length += self.position
+        self.position = 0
+
+    def close(self):
+        self.write(END_OF_TRACK)
+        self.flush()
+        end = self.file.tell()
+        self.file.seek(self.length_position)
+        self.file.write(struct.pack('>L', self.length))
+        self.file.seek(end)
@@ -0,0 +1,129 @@
+import functools
+
+from notehole.music import Note, Rest, Chord
+from . import tables
+from .midi import MidiExporter, VELOCITY
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+BLOCK_FRAMES = 16 * 1024
+CACHE_SIZE = 4096
+
+# additive piano: relative amplitudes of the first partials
+PARTIALS = (1.0, 0.45, 0.25, 0.12, 0.07, 0.03)
+ATTACK = 0.005
+RELEASE = 0.08
+GAIN = 0.15
+
+
+class Synthesizer(object):
+    # A resident instrument rendering scores straight to PCM, without a
+    # MIDI file or a synthesizer process. Note buffers are cached per
+    # (note, frames), so they are shared across the notes of a score and
+    # across renders for as long as the synthesizer lives.
+
+    TICK = MidiExporter.TICK
+
+    def __init__(self, sample_rate=SAMPLE_RATE, cache_size=CACHE_SIZE):
+        if numpy is None:
+            raise ImportError('numpy is required for Synthesizer')
+        self.sample_rate = sample_rate
+        self.note_buffer = functools.lru_cache(maxsize=cache_size)(
+            self.render_note)
+
+    def render_note(self, midi_note, frames):
+        frequency = 440.0 * 2 ** ((midi_note - 69) / 12)
+        release = int(RELEASE * self.sample_rate)
+        t = numpy.arange(frames + release) / self.sample_rate
+
+        wave = numpy.zeros(len(t))
+        for harmonic, amplitude in enumerate(PARTIALS, 1):
+            if frequency * harmonic < self.sample_rate / 2:
+                wave += amplitude * numpy.sin(2 * numpy.pi * frequency *
+                                              harmonic * t)
+
+        # low notes ring longer, as on a piano
+        decay = 1.5 * min(max(261.6 / frequency, 0.25), 4) ** 0.5
+        envelope = numpy.exp(-t / decay)
+        attack = max(int(ATTACK * self.sample_rate), 1)
+        envelope[:attack] *= numpy.linspace(0, 1, attack)
+        envelope[frames:] *= numpy.linspace(1, 0, release)
+
+        gain = GAIN * VELOCITY / 127
+        return (wave * envelope * gain).astype(numpy.float32)
+
+    def frames_per_tick(self, tempo):
+        return self.sample_rate * 60 / (tempo * self.TICK)
+
+    def events(self, score):
+        # (start frame, buffer) for every tone in order, then the end of the
+        # score as (end frame, None)
+        frames_per_tick = self.frames_per_tick(score.tempo)
+        ticks = 0
+        for item in score:
+            duration = tables.duration_ticks(item.duration.value,
+                                             item.duration.dots, self.TICK)
+            start = round(ticks * frames_per_tick)
+            frames = round((ticks + duration) * frames_per_tick) - start
+            if isinstance(item, Note):
+                tones = (item.tone,)
+            elif isinstance(item, Chord):
+                tones = item.sorted_tones()
+            elif isinstance(item, Rest):
+                tones = ()
+            else:
+                raise Exception('unknown item {}'.format(item))
+            for tone in tones:
+                midi_note = tables.midi_note(tone.pitch, tone.accidental)
+                yield start, self.note_buffer(midi_note, frames)
+            ticks += duration
+        yield round(ticks * frames_per_tick), None
+
+    def stream(self, score, block=BLOCK_FRAMES):
+        # mixes the score block by block, so memory depends on how many
+        # notes overlap and not on the length of the score
+        events = self.events(score)
+        pending = next(events)
+        active = []
+        position = 0
+        end = None
+
+        while end is None or position < end:
+            stop = position + block
+            while pending[1] is not None and pending[0] < stop:
+                active.append(pending)
+                pending = next(events)
+            if end is None and pending[1] is None:
+                end = max([pending[0]] +
+                          [start + len(buffer) for start, buffer in active])
+            if end is not None:
+                stop = min(stop, end)
+
+            mix = numpy.zeros(stop - position, numpy.float32)
+            remaining = []
+            for start, buffer in active:
+                first = max(start, position)
+                last = min(start + len(buffer), stop)
+                if first < last:
+                    mix[first - position:last - position] += \
+                        buffer[first - start:last - start]
+                if start + len(buffer) > stop:
+                    remaining.append((start, buffer))
+            active = remaining
+
+            if len(mix):
+                yield self.to_pcm(mix)
+            position = stop
+
+    def to_pcm(self, mix):
+        samples = numpy.clip(mix, -1, 1) * 32767
+        samples = numpy.repeat(samples.astype('<i2'), CHANNELS)
+        return samples.tobytes()
+
+    def cache_info(self):
+        return self.note_buffer.cache_info()
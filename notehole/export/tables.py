@@ -0,0 +1,81 @@
+import functools
+
+from notehole.music import duration_length
+
+TABLE_SIZE = 1024
+
+SEMITONES = {
+    0: 0,
+    1: 2,
+    2: 4,
+    3: 5,
+    4: 7,
+    5: 9,
+    6: 11
+}
+
+TONE_SYMBOLS = {
+    0: 'c',
+    1: 'd',
+    2: 'e',
+    3: 'f',
+    4: 'g',
+    5: 'a',
+    6: 'b',
+}
+
+ACCIDENTAL_SYMBOLS = {
+    -2: 'eses',
+    -1: 'es',
+    0: '',
+    1: 'is',
+    2: 'isis',
+}
+
+
+@functools.lru_cache(maxsize=TABLE_SIZE)
+def duration_ticks(value, dots, tick):
+    # tick is the length of a quarter note
+    length = duration_length(value, dots) * tick * 4
+    return length.numerator // length.denominator
+
+
+@functools.lru_cache(maxsize=TABLE_SIZE)
+def midi_note(pitch, accidental):
+    octave, position = divmod(pitch, 7)
+    return (octave + 1) * 12 + SEMITONES[position] + accidental
+
+
+@functools.lru_cache(maxsize=TABLE_SIZE)
+def lilypond_tone(position, accidental, octave):
+    if octave > 0:
+        marks = "'" * octave
+    elif octave < 0:
+        marks = ',' * abs(octave)
+    else:
+        marks = ''
+    return "{}{}{}".format(TONE_SYMBOLS[position],
+                           ACCIDENTAL_SYMBOLS[accidental],
+                           marks)
+
+
+@functools.lru_cache(maxsize=TABLE_SIZE)
+def lilypond_duration(value, dots):
+    return "{}{}".format(value, '.' * dots)
+
+
+TABLES = {
+    'duration_ticks': duration_ticks,
+    'midi_note': midi_note,
+    'lilypond_tone': lilypond_tone,
+    'lilypond_duration': lilypond_duration,
+}
+
+
+def table_stats():
+    return {name: table.cache_info() for name, table in TABLES.items()}
+
+
+def clear_tables():
+    for table in TABLES.values():
+        table.cache_clear()
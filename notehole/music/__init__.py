@@ -1,7 +1,9 @@
 from .note import parse_note, Note
 from .tone import parse_tone, Tone
-from .duration import parse_duration, Duration
+from .duration import parse_duration, duration_length, Duration
 from .rest import Rest
 from .chord import Chord
-from .score import Score
+from .score import Score, window, shared_timing
 from .meter import Meter
+from .packed import pack_score, PackedScore
+from .timeindex import TimeIndex, TimeIndexed, ScoreView
@@ -1,8 +1,14 @@
-class Chord(object):
+from .value import Value
 
-    def __init__(self, tones, duration):
-        self.tones = tones
-        self.duration = duration
+
+class Chord(Value, weak=True):
+
+    __slots__ = ('tones', 'duration')
+
+    def __new__(cls, tones, duration):
+        tones = frozenset(tones)
+        return cls.intern((tones, duration),
+                          {'tones': tones, 'duration': duration})
 
     def __repr__(self):
         tones = ", ".join(repr(t) for t in self.sorted_tones())
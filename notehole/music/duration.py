@@ -1,5 +1,10 @@
+import functools
 import re
 
+from fractions import Fraction
+
+from .value import Value
+
 duration_regex = re.compile(r"\-(\d+)(\.*)$")
 
 def parse_duration(text):
@@ -10,12 +15,36 @@ def parse_duration(text):
     return Duration(length, dots)
 
 
-class Duration(object):
+@functools.lru_cache(maxsize=None)
+def duration_length(value, dots=0):
+    # a duration with n dots lasts (2^(n+1) - 1) / 2^n times its base value
+    return Fraction(2 ** (dots + 1) - 1, value * 2 ** dots)
+
+
+@functools.total_ordering
+class Duration(Value):
+
+    __slots__ = ('value', 'dots')
 
-    def __init__(self, value, dots=0):
-        self.value = value
-        self.dots = dots
+    def __new__(cls, value, dots=0):
+        return cls.intern((value, dots), {'value': value, 'dots': dots})
 
     def __repr__(self):
         dots = '.' * self.dots if self.dots else ''
         return "{}{}".format(self.value, dots)
+
+    @property
+    def length(self):
+        return duration_length(self.value, self.dots)
+
+    def __lt__(self, other):
+        if not isinstance(other, Duration):
+            return NotImplemented
+        return self.length < other.length
+
+    def __add__(self, other):
+        if isinstance(other, Duration):
+            return self.length + other.length
+        return self.length + other
+
+    __radd__ = __add__
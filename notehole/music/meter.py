@@ -1,8 +1,12 @@
-class Meter(object):
+from .value import Value
 
-    def __init__(self, beats, bar):
-        self.beats = beats
-        self.bar = bar
+
+class Meter(Value):
+
+    __slots__ = ('beats', 'bar')
+
+    def __new__(cls, beats, bar):
+        return cls.intern((beats, bar), {'beats': beats, 'bar': bar})
 
     def __repr__(self):
         return "{}/{}".format(self.beats, self.bar)
@@ -4,6 +4,7 @@ from .tone import Tone, parse_tone
 from .duration import Duration, parse_duration
 from .rest import Rest
 from .chord import Chord
+from .value import Value
 
 def parse_note(text):
     duration = parse_duration(text)
@@ -14,11 +15,12 @@ def parse_note(text):
     return Note(tone, duration)
 
 
-class Note(object):
+class Note(Value, weak=True):
 
-    def __init__(self, tone, duration):
-        self.tone = tone
-        self.duration = duration
+    __slots__ = ('tone', 'duration')
+
+    def __new__(cls, tone, duration):
+        return cls.intern((tone, duration), {'tone': tone, 'duration': duration})
 
     def __repr__(self):
         tone = repr(self.tone)
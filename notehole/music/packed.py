@@ -0,0 +1,132 @@
+from array import array
+
+from .tone import Tone
+from .duration import Duration, duration_length
+from .note import Note
+from .rest import Rest
+from .chord import Chord
+from .score import Score, COMMON_METER
+from .timeindex import TimeIndex, TimeIndexed
+
+REST = 0
+NOTE = 1
+CHORD = 2
+
+
+def pack_score(score):
+    return PackedScore.from_score(score)
+
+
+class PackedScore(TimeIndexed):
+
+    def __init__(self, meter=None, tempo=120, items=None):
+        self.meter = meter or COMMON_METER
+        self.tempo = tempo
+
+        # one entry per event
+        self.kinds = array('b')
+        self.values = array('H')
+        self.dots = array('B')
+        self.starts = array('I')
+
+        # one entry per tone, events point into them through `starts`
+        self.pitches = array('h')
+        self.accidentals = array('b')
+
+        self._index = None
+
+        if items:
+            self.extend(items)
+
+    @classmethod
+    def from_score(cls, score):
+        return cls(score.meter, score.tempo, score)
+
+    def to_score(self):
+        return Score(meter=self.meter, tempo=self.tempo, items=tuple(self))
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __iter__(self):
+        for index in range(len(self.kinds)):
+            yield self.item(index)
+
+    def __reversed__(self):
+        for index in reversed(range(len(self.kinds))):
+            yield self.item(index)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            items = (self.item(i) for i in range(*index.indices(len(self))))
+            return PackedScore(self.meter, self.tempo, items)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('item index out of range')
+        return self.item(index)
+
+    def time_index(self):
+        # the columns may be filled in directly (see notehole.vectorized), so
+        # the index catches up from them instead of hooking append_event()
+        index = self._index
+        if index is None or len(index) > len(self):
+            index = self._index = TimeIndex()
+        if len(index) < len(self):
+            start = len(index)
+            index.extend(duration_length(value, dots) for value, dots
+                         in zip(self.values[start:], self.dots[start:]))
+        return index
+
+    def __repr__(self):
+        return "<PackedScore {meter} @ {tempo}: {size} items>".format(
+            meter=repr(self.meter), tempo=self.tempo, size=len(self))
+
+    def append(self, item):
+        if isinstance(item, Rest):
+            self.append_event(REST, item.duration)
+        elif isinstance(item, Note):
+            self.append_event(NOTE, item.duration)
+            self.append_tone(item.tone)
+        elif isinstance(item, Chord):
+            self.append_event(CHORD, item.duration)
+            for tone in item.sorted_tones():
+                self.append_tone(tone)
+        else:
+            raise Exception('unknown item {}'.format(item))
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def append_event(self, kind, duration):
+        self.kinds.append(kind)
+        self.values.append(duration.value)
+        self.dots.append(duration.dots)
+        self.starts.append(len(self.pitches))
+
+    def append_tone(self, tone):
+        self.pitches.append(tone.pitch)
+        self.accidentals.append(tone.accidental)
+
+    def tone_range(self, index):
+        start = self.starts[index]
+        if index + 1 < len(self.starts):
+            return start, self.starts[index + 1]
+        return start, len(self.pitches)
+
+    def tone(self, position):
+        return Tone(self.pitches[position], self.accidentals[position])
+
+    def item(self, index):
+        kind = self.kinds[index]
+        duration = Duration(self.values[index], self.dots[index])
+
+        if kind == REST:
+            return Rest(duration)
+        elif kind == NOTE:
+            return Note(self.tone(self.starts[index]), duration)
+
+        start, end = self.tone_range(index)
+        tones = {self.tone(p) for p in range(start, end)}
+        return Chord(tones, duration)
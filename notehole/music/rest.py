@@ -1,7 +1,12 @@
-class Rest(object):
+from .value import Value
 
-    def __init__(self, duration):
-        self.duration = duration
+
+class Rest(Value, weak=True):
+
+    __slots__ = ('duration',)
+
+    def __new__(cls, duration):
+        return cls.intern((duration,), {'duration': duration})
 
     def __repr__(self):
         return "R-{}".format(repr(self.duration))
@@ -1,17 +1,81 @@
+import itertools
+
 from .meter import Meter
+from .timeindex import TimeIndex, TimeIndexed
 
 COMMON_METER = Meter(4, 4)
 
-class Score(object):
+
+def window(score, time=None, measures=None):
+    # the part of `score` to export: a (start, end) range in whole notes or
+    # in measures, either end may be None; the whole score if neither is given
+    if time is None and measures is None:
+        return score
+    if not hasattr(score, 'time_index'):
+        score = Score(score.meter, score.tempo, list(score))
+    if measures is not None:
+        return score.slice_measures(*measures)
+    return score.slice_time(*time)
+
+
+def shared_timing(scores):
+    # the meter and tempo of scores exported together as parts of one piece:
+    # a MIDI file has a single tempo map, and staves share their bar lines
+    if not scores:
+        raise ValueError('no scores to export')
+    meter, tempo = scores[0].meter, scores[0].tempo
+    for score in scores[1:]:
+        if score.meter != meter or score.tempo != tempo:
+            raise ValueError('scores must share a meter and tempo, got {} @ {} '
+                             'and {} @ {}'.format(meter, tempo,
+                                                  score.meter, score.tempo))
+    return meter, tempo
+
+
+class Score(TimeIndexed):
 
     def __init__(self, meter=None, tempo=120, items=None):
         self.meter = meter or COMMON_METER
         self.tempo = tempo
         self.items = items or []
+        self._index = None
+        self._indexed_items = None
 
     def __iter__(self):
         yield from self.items
 
+    def __len__(self):
+        return len(self.items)
+
+    def append(self, item):
+        if not isinstance(self.items, list):
+            self.items = list(self.items)
+            self._indexed_items = self.items
+        self.items.append(item)
+        if self._index is not None:
+            self._index.append(item.duration.length)
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def time_index(self):
+        # built on first use, then kept in step with append(); items appended
+        # straight to the list are picked up here, anything else rebuilds
+        index = self._index
+        if (index is None or self._indexed_items is not self.items
+                or len(index) > len(self.items)):
+            index = self._index = TimeIndex()
+            self._indexed_items = self.items
+        if len(index) < len(self.items):
+            if isinstance(self.items, (list, tuple)):
+                added = self.items[len(index):]
+            else:
+                # folds return a Repeated, without a cheap slice
+                added = itertools.islice(self.items, len(index), None)
+            index.extend(item.duration.length for item in added)
+        return index
+
     def __repr__(self):
         meter = repr(self.meter)
         items = repr(self.items)
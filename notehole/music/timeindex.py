@@ -0,0 +1,173 @@
+import math
+
+from array import array
+from bisect import bisect_left, bisect_right
+from fractions import Fraction
+
+
+class TimeIndex(object):
+    # Onsets are prefix sums kept as integer ticks of 1/unit whole note, so
+    # that building and searching never touch Fraction arithmetic. The unit
+    # grows (and the ticks are rescaled) when a finer duration shows up.
+
+    def __init__(self, lengths=()):
+        self.unit = 1
+        self.ticks = array('q', [0])
+        self.extend(lengths)
+
+    def __len__(self):
+        return len(self.ticks) - 1
+
+    def append(self, length):
+        if self.unit % length.denominator:
+            self.rescale(self.unit * length.denominator
+                         // math.gcd(self.unit, length.denominator))
+        step = length.numerator * (self.unit // length.denominator)
+        self.ticks.append(self.ticks[-1] + step)
+
+    def extend(self, lengths):
+        # the loop of append() with the lookups hoisted, for bulk building
+        ticks, unit, tick = [], self.unit, self.ticks[-1]
+        for length in lengths:
+            if unit % length.denominator:
+                self.ticks.extend(ticks)
+                self.rescale(unit * length.denominator
+                             // math.gcd(unit, length.denominator))
+                ticks, unit, tick = [], self.unit, self.ticks[-1]
+            tick += length.numerator * (unit // length.denominator)
+            ticks.append(tick)
+        self.ticks.extend(ticks)
+
+    def rescale(self, unit):
+        factor = unit // self.unit
+        self.ticks = array('q', (tick * factor for tick in self.ticks))
+        self.unit = unit
+
+    def onset(self, index):
+        return Fraction(self.ticks[index], self.unit)
+
+    def length(self):
+        return self.onset(-1)
+
+    def index_at(self, time):
+        # index of the item sounding at `time`, in whole notes from the start
+        position = Fraction(time) * self.unit
+        if not 0 <= position < self.ticks[-1]:
+            raise IndexError('time out of range')
+        return bisect_right(self.ticks, math.floor(position)) - 1
+
+    def span(self, start=0, end=None):
+        # items overlapping [start, end), whole items only
+        start = Fraction(start) * self.unit
+        if start >= self.ticks[-1]:
+            return len(self), len(self)
+        first = max(bisect_right(self.ticks, math.floor(start),
+                                 hi=len(self)) - 1, 0)
+        if end is None:
+            return first, len(self)
+        end = Fraction(end) * self.unit
+        if end <= start:
+            return first, first
+        stop = bisect_left(self.ticks, math.ceil(end), hi=len(self))
+        return first, max(stop, first)
+
+
+def beat_time(meter, beat):
+    return Fraction(beat) / meter.bar
+
+
+def measure_time(meter, measure):
+    return Fraction(measure) * meter.beats / meter.bar
+
+
+class TimeIndexed(object):
+    # lookups and slices shared by the score classes, which provide
+    # time_index(); lookups return the index of the item sounding at the
+    # given position, times are in whole notes, beats and measures count
+    # from 0
+
+    def onset(self, index):
+        return self.time_index().onset(index)
+
+    def length(self):
+        return self.time_index().length()
+
+    def index_at(self, time):
+        return self.time_index().index_at(time)
+
+    def index_at_beat(self, beat):
+        return self.index_at(beat_time(self.meter, beat))
+
+    def index_at_measure(self, measure):
+        return self.index_at(measure_time(self.meter, measure))
+
+    # slices are views over the items overlapping the range, which is
+    # half-open; items crossing either edge are kept whole
+
+    def slice_time(self, start=0, end=None):
+        return ScoreView(self, *self.time_index().span(start, end))
+
+    def slice_beats(self, start=0, end=None):
+        end = None if end is None else beat_time(self.meter, end)
+        return self.slice_time(beat_time(self.meter, start), end)
+
+    def slice_measures(self, start=0, end=None):
+        end = None if end is None else measure_time(self.meter, end)
+        return self.slice_time(measure_time(self.meter, start), end)
+
+
+class ScoreView(object):
+
+    def __init__(self, score, start, stop):
+        self.score = score
+        self.start = start
+        self.stop = stop
+
+    @property
+    def meter(self):
+        return self.score.meter
+
+    @property
+    def tempo(self):
+        return self.score.tempo
+
+    @property
+    def offset(self):
+        return self.score.time_index().onset(self.start)
+
+    @property
+    def measure_offset(self):
+        # where the first item starts within its measure
+        return self.offset % measure_time(self.meter, 1)
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __iter__(self):
+        items = getattr(self.score, 'items', self.score)
+        for index in range(self.start, self.stop):
+            yield items[index]
+
+    def __reversed__(self):
+        items = getattr(self.score, 'items', self.score)
+        for index in reversed(range(self.start, self.stop)):
+            yield items[index]
+
+    def preceding(self):
+        # the items before the view, nearest first
+        items = getattr(self.score, 'items', self.score)
+        for index in reversed(range(self.start)):
+            yield items[index]
+
+    def length(self):
+        index = self.score.time_index()
+        return index.onset(self.stop) - index.onset(self.start)
+
+    def to_score(self):
+        return type(self.score)(meter=self.meter, tempo=self.tempo,
+                                items=list(self))
+
+    def __repr__(self):
+        return "<ScoreView {meter} @ {tempo}: items {start}:{stop}>".format(
+            meter=repr(self.meter), tempo=self.tempo, start=self.start,
+            stop=self.stop)
@@ -1,5 +1,7 @@
 import re
 
+from .value import Value
+
 NB_PITCHES = 7
 DEFAULT_OCTAVE = 3
 
@@ -39,11 +41,14 @@ def parse_tone(text):
     return Tone(pitch, accidental)
 
 
-class Tone(object):
+class Tone(Value):
+
+    __slots__ = ('pitch', 'accidental')
 
-    def __init__(self, pitch, accidental=0):
-        self.pitch = pitch
-        self.accidental = accidental
+    def __new__(cls, pitch, accidental=0):
+        return cls.intern((pitch, accidental),
+                          {'pitch': pitch, 'accidental': accidental},
+                          pitch * 5 + 2 + accidental)
 
     @classmethod
     def with_octave(cls, pitch, octave, accidental=0):
@@ -54,12 +59,6 @@ class Tone(object):
                                ACCIDENTALS[self.accidental],
                                self.octave)
 
-    def __hash__(self):
-        return self.pitch * 5 + 2 + self.accidental
-
-    def __eq__(self, other):
-        return self.pitch == other.pitch and self.accidental == other.accidental
-
     @property
     def octave(self):
         return self.pitch // NB_PITCHES
@@ -0,0 +1,45 @@
+import weakref
+
+
+class Value(object):
+    """Immutable value interned in a per-class pool, so that equal values are
+    usually the same object. Subclasses build instances through `intern`,
+    with the constructor arguments as the key."""
+
+    __slots__ = ('_key', '_hash', '__weakref__')
+
+    def __init_subclass__(cls, weak=False, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._pool = weakref.WeakValueDictionary() if weak else {}
+
+    @classmethod
+    def intern(cls, key, fields, key_hash=None):
+        value = cls._pool.get(key)
+        if value is None:
+            value = object.__new__(cls)
+            for name, field in fields.items():
+                object.__setattr__(value, name, field)
+            object.__setattr__(value, '_key', key)
+            object.__setattr__(value, '_hash',
+                               hash(key) if key_hash is None else key_hash)
+            value = cls._pool.setdefault(key, value)
+        return value
+
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def __delattr__(self, name):
+        raise AttributeError("{} is immutable".format(type(self).__name__))
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return type(self), self._key
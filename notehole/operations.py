@@ -1,15 +1,27 @@
 import itertools
-from notehole.music import Tone
+from bisect import bisect_right
+from collections.abc import Reversible
+from notehole import vectorized
+from notehole.music import Tone, Score, PackedScore
 
 B_AXIS = Tone(34)
 
 
 def reverse(items):
+    if isinstance(items, PackedScore):
+        return vectorized.reverse(items)
+    if isinstance(items, Repeated):
+        return Repeated(tuple(reverse(b) for b in items.blocks),
+                        items.order[::-1])
     return tuple(reversed(items))
 
 
 def flip(items, axis=None):
     axis = axis or B_AXIS
+    if isinstance(items, PackedScore):
+        return vectorized.flip(items, axis)
+    if isinstance(items, Repeated):
+        return items.map_blocks(lambda b: flip(b, axis))
     return tuple(i.flip(axis) for i in items)
 
 
@@ -18,20 +30,162 @@ def rotate_180(items):
 
 
 def vertical_fold(items, repeats=1):
-    cycle = itertools.cycle((items, reverse(items)))
-    return _repeat_fold(cycle, repeats)
+    if isinstance(items, PackedScore):
+        return vectorized.vertical_fold(items, repeats)
+    items = _block(items)
+    return Repeated((items, reverse(items)), _alternate(repeats))
 
 
 def horizontal_fold(items, axis=None):
     axis = axis or B_AXIS
+    if isinstance(items, PackedScore):
+        return vectorized.horizontal_fold(items, axis)
+    if isinstance(items, Repeated):
+        return items.map_blocks(lambda b: horizontal_fold(b, axis))
     return tuple(i.fold(axis) for i in items)
 
 
 def mobius_fold(items, repeats=1):
-    cycle = itertools.cycle((items, flip(items)))
-    return _repeat_fold(cycle, repeats)
+    if isinstance(items, PackedScore):
+        return vectorized.mobius_fold(items, B_AXIS, repeats)
+    items = _block(items)
+    return Repeated((items, flip(items)), _alternate(repeats))
 
 
-def _repeat_fold(cycle, repeats):
-    repeats = itertools.islice(cycle, repeats + 1)
-    return itertools.chain.from_iterable(repeats)
+def _block(items):
+    if isinstance(items, (tuple, Repeated)):
+        return items
+    return tuple(items)
+
+
+def _alternate(repeats):
+    return tuple(index % 2 for index in range(repeats + 1))
+
+
+class Repeated(object):
+    # A sequence of items made of a few distinct blocks, played in `order`
+    # (indexes into `blocks`). Each block is stored once however often it
+    # repeats, and exporters can encode it once too.
+
+    def __init__(self, blocks, order):
+        self.blocks = tuple(blocks)
+        self.order = tuple(order)
+        self.offsets = list(itertools.accumulate(
+            (len(self.blocks[b]) for b in self.order), initial=0))
+
+    def map_blocks(self, function):
+        return Repeated(tuple(function(b) for b in self.blocks), self.order)
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def __iter__(self):
+        for block in self.order:
+            yield from self.blocks[block]
+
+    def __reversed__(self):
+        for block in reversed(self.order):
+            yield from reversed(self.blocks[block])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(itertools.islice(self, *index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('item index out of range')
+        position = bisect_right(self.offsets, index) - 1
+        block = self.blocks[self.order[position]]
+        return block[index - self.offsets[position]]
+
+    def __repr__(self):
+        return "<Repeated {} blocks, {} items>".format(len(self.blocks),
+                                                       len(self))
+
+
+class Pipeline(object):
+
+    def __init__(self, score, steps=()):
+        if not isinstance(score, (Score, Reversible)):
+            score = tuple(score)
+        self.score = score
+        self.steps = steps
+
+    def push(self, step):
+        last = self.steps[-1] if self.steps else None
+        if step[0] in ('flip', 'reverse') and step == last:
+            return Pipeline(self.score, self.steps[:-1])
+        return Pipeline(self.score, self.steps + (step,))
+
+    def reverse(self):
+        return self.push(('reverse',))
+
+    def flip(self, axis=None):
+        return self.push(('flip', axis or B_AXIS))
+
+    def rotate_180(self):
+        return self.reverse().flip()
+
+    def vertical_fold(self, repeats=1):
+        return self.push(('vertical_fold', repeats))
+
+    def horizontal_fold(self, axis=None):
+        return self.push(('fold', axis or B_AXIS))
+
+    def mobius_fold(self, repeats=1):
+        return self.push(('mobius_fold', repeats))
+
+    def items(self):
+        if isinstance(self.score, Score):
+            return self.score.items
+        return self.score
+
+    def segments(self):
+        # each segment is one pass over the original items, either forwards
+        # or backwards, with a chain of per-item transformations
+        segments = [(False, ())]
+        for step in self.steps:
+            name = step[0]
+            if name == 'reverse':
+                segments = [(not backwards, maps)
+                            for backwards, maps in reversed(segments)]
+            elif name in ('flip', 'fold'):
+                segments = [(backwards, _push_map(maps, step))
+                            for backwards, maps in segments]
+            elif name == 'vertical_fold':
+                backwards = [(not b, maps) for b, maps in reversed(segments)]
+                segments = _repeat_segments(segments, backwards, step[1])
+            elif name == 'mobius_fold':
+                flipped = [(b, _push_map(maps, ('flip', B_AXIS)))
+                           for b, maps in segments]
+                segments = _repeat_segments(segments, flipped, step[1])
+        return segments
+
+    def __iter__(self):
+        items = self.items()
+        for backwards, maps in self.segments():
+            source = reversed(items) if backwards else items
+            if not maps:
+                yield from source
+                continue
+            for item in source:
+                for name, axis in maps:
+                    item = getattr(item, name)(axis)
+                yield item
+
+    def to_score(self):
+        return Score(meter=getattr(self.score, 'meter', None),
+                     tempo=getattr(self.score, 'tempo', 120),
+                     items=tuple(self))
+
+
+def _push_map(maps, step):
+    if step[0] == 'flip' and maps and maps[-1] == step:
+        return maps[:-1]
+    return maps + (step,)
+
+
+def _repeat_segments(segments, alternate, repeats):
+    cycle = itertools.cycle((segments, alternate))
+    return list(itertools.chain.from_iterable(
+        itertools.islice(cycle, repeats + 1)))
@@ -1 +1,2 @@
-from .lilypond import parse_lilypond
+from .lilypond import parse_lilypond, iter_lilypond, ParseError
+from .corpus import load_corpus
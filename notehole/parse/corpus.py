@@ -0,0 +1,108 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+
+from notehole.music import PackedScore
+from notehole.util import ordered_map
+from .lilypond import parse_lilypond
+
+# bump whenever the parser produces different scores for the same input,
+# so that stale cache entries are ignored
+PARSER_VERSION = 1
+
+
+def load_corpus(paths, workers=None, cache_dir=None):
+    paths = list(paths)
+    results = [None] * len(paths)
+
+    def jobs():
+        # files are read as ordered_map pulls them, so only the few in
+        # flight are in memory whatever the size of the corpus. Unreadable
+        # files and cache hits are settled here and never reach a worker.
+        for index, path in enumerate(paths):
+            start = time.perf_counter()
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                results[index] = CorpusResult(path, None, e,
+                                              time.perf_counter() - start)
+                continue
+            key = cache_key(data)
+
+            score = load_cached(cache_dir, key) if cache_dir else None
+            if score is not None:
+                elapsed = time.perf_counter() - start
+                results[index] = CorpusResult(path, score, elapsed=elapsed,
+                                              cached=True)
+            else:
+                yield index, key, data
+
+    for index, key, score, error, elapsed in ordered_map(_parse, jobs(),
+                                                         workers):
+        results[index] = CorpusResult(paths[index], score, error, elapsed)
+        if cache_dir and score is not None:
+            store_cached(cache_dir, key, score)
+
+    return results
+
+
+def cache_key(data):
+    digest = hashlib.sha256(data)
+    digest.update('parser-{}'.format(PARSER_VERSION).encode())
+    return digest.hexdigest()
+
+
+def load_cached(cache_dir, key):
+    try:
+        with open(os.path.join(cache_dir, key), 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        # missing, damaged, or pickled from classes that have changed since
+        return None
+
+
+def store_cached(cache_dir, key, score):
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(score, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, os.path.join(cache_dir, key))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _parse(job):
+    index, key, data = job
+    start = time.perf_counter()
+    try:
+        score = PackedScore.from_score(parse_lilypond(data.decode('utf-8')))
+        error = None
+    except Exception as e:
+        score, error = None, e
+    return index, key, score, error, time.perf_counter() - start
+
+
+class CorpusResult(object):
+
+    def __init__(self, path, score, error=None, elapsed=0, cached=False):
+        self.path = path
+        self.score = score
+        self.error = error
+        self.elapsed = elapsed
+        self.cached = cached
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        status = 'cached' if self.cached else 'parsed'
+        if not self.ok:
+            status = repr(self.error)
+        return "<CorpusResult {} {:.4f}s: {}>".format(self.path, self.elapsed,
+                                                       status)
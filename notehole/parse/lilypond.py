@@ -1,21 +1,37 @@
 import abc
+import itertools
+import re
 
 import ly.document
+import ly.pitch
 
 from fractions import Fraction
 from ly.music import document as music_document, items
-from notehole.music import Score, Note, Duration, Tone, Chord, Rest, Meter
+from notehole.music import (Score, Note, Duration, Tone, Chord, Rest, Meter,
+                            duration_length)
+from notehole.music.score import COMMON_METER
 
 BASE_OCTAVE = 3
 
 def parse_lilypond(text):
-    converters = {items.Note: NoteConverter(),
-                  items.Chord: ChordConverter(),
-                  items.Rest: RestConverter()}
-    parser = LilypondParser(converters)
+    score = FastLilypondParser().parse(text)
+    if score is not None:
+        return score
+
+    parser = LilypondParser(default_converters())
     return parser.parse(text)
 
 
+def iter_lilypond(text_or_file):
+    return LilypondStream(text_or_file)
+
+
+def default_converters():
+    return {items.Note: NoteConverter(),
+            items.Chord: ChordConverter(),
+            items.Rest: RestConverter()}
+
+
 class ParseError(Exception):
     pass
 
@@ -34,6 +50,7 @@ class Filter(metaclass=abc.ABCMeta):
 class MusicFilter(Filter):
 
     IGNORE = (items.TimeSignature,
+              items.Partial,
               )
 
     def __iter__(self):
@@ -100,8 +117,15 @@ class Converter(metaclass=abc.ABCMeta):
                                 int(pitch.alter * 2))
 
     def convert_duration(self, duration):
-        base = next(i for i in self.DURATIONS if duration[0] // i == 1)
-        dots = self.calculate_dots(base, duration[0])
+        converted = DURATION_TABLE.get(duration[0])
+        if converted is None:
+            converted = DURATION_TABLE[duration[0]] = \
+                self.compute_duration(duration[0])
+        return converted
+
+    def compute_duration(self, length):
+        base = next(i for i in self.DURATIONS if length // i == 1)
+        dots = self.calculate_dots(base, length)
         return Duration(base.denominator, dots)
 
     def calculate_dots(self, base, duration):
@@ -170,23 +194,46 @@ class RestConverter(Converter):
         return Rest(duration)
 
 
+def _duration_table(max_dots=7):
+    # maps the lengths found in python-ly durations to our Duration objects
+    converter = RestConverter()
+    table = {}
+    for base in Converter.DURATIONS:
+        for dots in range(max_dots + 1):
+            length = duration_length(base.denominator, dots)
+            table[length] = converter.compute_duration(length)
+    return table
+
+
+DURATION_TABLE = _duration_table()
+
+
 class LilypondParser(object):
 
     def __init__(self, converters):
         self.converters = converters
 
     def parse(self, text):
+        return self.parse_music(self.read_music(text))
+
+    def iter_parse(self, text):
+        music_filter = self.find_music(self.read_music(text))
+        return (self.convert_item(item) for item in music_filter)
+
+    def read_music(self, text):
         document = ly.document.Document(text)
-        music = music_document(document)
-        return self.parse_music(music)
+        return music_document(document)
 
     def parse_music(self, music):
-        relative_pitch = self.find_relative_pitch(music)
-        music_list = self.find_music_list(music)
-        music_filter = self.build_filters(music_list, relative_pitch)
+        music_filter = self.find_music(music)
         time_signature = self.find_time_signature(music)
         return self.build_score(music_filter, time_signature)
 
+    def find_music(self, music):
+        relative_pitch = self.find_relative_pitch(music)
+        music_list = self.find_music_list(music)
+        return self.build_filters(music_list, relative_pitch)
+
     def find_music_list(self, music):
         music_list = music.find_child(items.MusicList)
         if not music_list:
@@ -236,3 +283,297 @@ class LilypondParser(object):
     def convert_item(self, item):
         converter = self.converters.get(item.__class__)
         return converter.convert_item(item)
+
+
+def _pitch_names():
+    reader = ly.pitch.pitchReader('nederlands')
+    notes, accidentals, replacements = ly.pitch.pitchInfo['nederlands']
+    candidates = [n + a for n in notes for a in accidentals]
+    candidates.extend(r for pair in replacements for r in pair)
+
+    names = {}
+    for name in candidates:
+        pitch = reader(name)
+        if pitch and (pitch[1] * 2).denominator == 1:
+            names[name] = (pitch[0], int(pitch[1] * 2))
+    return names
+
+
+PITCH_NAMES = _pitch_names()
+
+NAME_PATTERN = r"(?:{})(?![a-z])".format(
+    '|'.join(sorted(PITCH_NAMES, key=len, reverse=True)))
+# octave marks go one way; python-ly reads mixed marks like d', differently,
+# so those fail here and are left to it
+OCTAVE_PATTERN = r"(?:'*|,*)(?![',])"
+PITCH_PATTERN = NAME_PATTERN + OCTAVE_PATTERN
+DURATION_PATTERN = r"(?:128|64|32|16|8|4|2|1)\.*"
+
+TOKEN_PATTERN = r"""
+    (?P<space>\s+|%(?!\{{)[^\n]*)
+  | (?P<time>\\time\s+(?P<beats>\d+)/(?P<bar>\d+))
+  | (?P<partial>\\partial(?![a-zA-Z])\s*(?P<partial_duration>{duration})
+        (?:\*\d+(?:/\d+)?)?)
+  | (?P<chord><(?P<tones>(?:\s*{pitch})+)\s*>(?P<chord_duration>{duration})?)
+  | (?P<rest>r(?![a-z])(?P<rest_duration>{duration})?)
+  | (?P<note>(?P<name>{name})(?P<octave>{octave})(?P<note_duration>{duration})?)
+""".format(pitch=PITCH_PATTERN, name=NAME_PATTERN, octave=OCTAVE_PATTERN,
+           duration=DURATION_PATTERN)
+
+HEADER_PATTERN = r"""
+    \s*(?:\\version\s*"[^"\n]*"\s*)?
+    (?:(?P<relative>\\relative(?![a-zA-Z]))\s*(?P<start>{pitch})?\s*)?
+    \{{
+""".format(pitch=PITCH_PATTERN)
+
+TOKEN_REGEX = re.compile(TOKEN_PATTERN, re.VERBOSE)
+HEADER_REGEX = re.compile(HEADER_PATTERN, re.VERBOSE)
+PITCH_REGEX = re.compile(r"(?P<name>{})(?P<octave>{})".format(NAME_PATTERN,
+                                                             OCTAVE_PATTERN))
+
+# how far into the text the header may go, and how close to the end of the
+# text read so far a token may fail before more text is needed to tell
+HEADER_LIMIT = 4096
+LOOKAHEAD = 1024
+
+
+class UnsupportedInput(Exception):
+    # input outside the subset of FastLilypondParser, python-ly handles it
+    pass
+
+
+# Handles the subset of LilyPond supported by LilypondParser without building
+# a python-ly music tree. `parse` returns None for anything outside of it.
+class FastLilypondParser(object):
+
+    DEFAULT_DURATION = '4'
+
+    durations = {}
+
+    def parse(self, text):
+        try:
+            relative_pitch, tokens = self.read([text])
+            tokens = list(tokens)
+        except UnsupportedInput:
+            return None
+
+        converted_items = tuple(self.iter_items(tokens, relative_pitch))
+        return Score(items=converted_items, meter=self.find_meter(tokens))
+
+    def read(self, chunks):
+        # the relative pitch and the body tokens of a document arriving in
+        # chunks of text; the tokens raise UnsupportedInput where the text
+        # leaves the subset
+        chunks = iter(chunks)
+        text = ''
+        header = None
+        for chunk in chunks:
+            text += chunk
+            header = HEADER_REGEX.match(text)
+            if header or len(text) > HEADER_LIMIT:
+                break
+        if not header:
+            raise UnsupportedInput()
+
+        tokens = self.scan(text[header.end():], chunks)
+        relative_pitch = None
+        if header.group('relative'):
+            relative_pitch, tokens = self.find_relative_pitch(header, tokens)
+        return relative_pitch, tokens
+
+    def scan(self, text, chunks):
+        # one token at a time: a single regex over the whole body backtracks
+        # exponentially on whitespace when the body is outside the subset.
+        # A token reaching the end of the text read so far may go on in the
+        # next chunk, so it waits for it.
+        position = 0
+        for chunk in itertools.chain(chunks, (None,)):
+            if chunk is not None:
+                text = text[position:] + chunk
+                position = 0
+            while position < len(text):
+                match = TOKEN_REGEX.match(text, position)
+                if match is None and text[position] == '}':
+                    self.check_end(text[position + 1:], chunks)
+                    return
+                if chunk is not None and (
+                        match is None and len(text) - position < LOOKAHEAD
+                        or match is not None and match.end() == len(text)):
+                    break
+                if match is None:
+                    raise UnsupportedInput()
+                yield match
+                position = match.end()
+        raise UnsupportedInput()
+
+    def check_end(self, text, chunks):
+        # only space may follow the closing brace
+        if text.strip() or any(chunk.strip() for chunk in chunks):
+            raise UnsupportedInput()
+
+    def find_relative_pitch(self, header, tokens):
+        start = header.group('start')
+        if start:
+            note, octave = self.read_pitch(PITCH_REGEX.fullmatch(start))
+            return (note, octave + BASE_OCTAVE), tokens
+
+        # same lookup order as LilypondParser: notes before notes in chords.
+        # The tokens read ahead are put back in front of the rest.
+        read = []
+        for match in tokens:
+            read.append(match)
+            if match.lastgroup == 'note':
+                pitch = PITCH_NAMES[match.group('name')][0], BASE_OCTAVE
+                return pitch, itertools.chain(read, tokens)
+        for match in read:
+            if match.lastgroup == 'chord':
+                match = PITCH_REGEX.search(match.group('tones'))
+                return (PITCH_NAMES[match.group('name')][0], BASE_OCTAVE), \
+                    iter(read)
+        raise UnsupportedInput()
+
+    def find_meter(self, tokens):
+        for match in tokens:
+            if match.lastgroup == 'time':
+                return Meter(int(match.group('beats')), int(match.group('bar')))
+        return None
+
+    def read_pitch(self, match):
+        octave = match.group('octave')
+        return (PITCH_NAMES[match.group('name')][0],
+                octave.count("'") - octave.count(','))
+
+    def iter_items(self, tokens, relative_pitch=None):
+        last = relative_pitch
+        duration = self.convert_duration(self.DEFAULT_DURATION)
+
+        for match in tokens:
+            kind = match.lastgroup
+            if kind == 'note':
+                duration = self.convert_duration(match.group('note_duration'),
+                                                 duration)
+                tone, last = self.convert_pitch(match, last)
+                yield Note(tone, duration)
+            elif kind == 'chord':
+                duration = self.convert_duration(match.group('chord_duration'),
+                                                 duration)
+                pitches = PITCH_REGEX.finditer(match.group('tones'))
+                tone, last = self.convert_pitch(next(pitches), last)
+                tones = {tone}
+                previous = last
+                for pitch in pitches:
+                    tone, previous = self.convert_pitch(pitch, previous)
+                    tones.add(tone)
+                yield Chord(tones, duration)
+            elif kind == 'rest':
+                duration = self.convert_duration(match.group('rest_duration'),
+                                                 duration)
+                yield Rest(duration)
+            elif kind == 'partial':
+                # ignored, like in LilypondParser, but its duration carries
+                # on to the next item
+                duration = self.convert_duration(
+                    match.group('partial_duration'), duration)
+
+    def convert_pitch(self, match, last):
+        note, accidental = PITCH_NAMES[match.group('name')]
+        octave = self.read_pitch(match)[1]
+        if last is None:
+            octave += BASE_OCTAVE
+        else:
+            last_note, last_octave = last
+            octave += last_octave - (note - last_note + 3) // 7
+        tone = Tone.with_octave(note, octave, accidental)
+        return tone, (note, octave) if last is not None else None
+
+    def convert_duration(self, text, previous=None):
+        if text is None:
+            return previous
+        duration = self.durations.get(text)
+        if duration is None:
+            length = duration_length(int(text.rstrip('.')), text.count('.'))
+            duration = NoteConverter().convert_duration((length, 1))
+            self.durations[text] = duration
+        return duration
+
+
+class LilypondStream(object):
+    # A score parsed from LilyPond text or a text file while it is iterated,
+    # so that neither the text nor the items are held. The fast path reads
+    # the file chunk by chunk; input outside its subset is parsed again by
+    # python-ly from the start, skipping the items already given. Each
+    # iteration reads the input again.
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, text_or_file, tempo=120):
+        self.source = text_or_file
+        self.tempo = tempo
+        self.start = None
+        self._meter = None
+
+        if hasattr(text_or_file, 'read'):
+            if text_or_file.seekable():
+                self.start = text_or_file.tell()
+            else:
+                # read once, it cannot be read again
+                self.source = text_or_file.read()
+
+    @property
+    def meter(self):
+        # from the first time signature, usually at the top of the file
+        if self._meter is None:
+            self._meter = self.find_meter() or COMMON_METER
+        return self._meter
+
+    def find_meter(self):
+        parser = FastLilypondParser()
+        try:
+            _, tokens = parser.read(self.chunks())
+            return parser.find_meter(tokens)
+        except UnsupportedInput:
+            pass
+
+        parser = LilypondParser(default_converters())
+        music = parser.read_music(self.text())
+        time_signature = parser.find_time_signature(music)
+        if time_signature:
+            return parser.convert_time_signature(time_signature)
+        return None
+
+    def __iter__(self):
+        parser = FastLilypondParser()
+        count = 0
+        try:
+            relative_pitch, tokens = parser.read(self.chunks())
+            for item in parser.iter_items(tokens, relative_pitch):
+                yield item
+                count += 1
+            return
+        except UnsupportedInput:
+            pass
+
+        parser = LilypondParser(default_converters())
+        items = parser.iter_parse(self.text())
+        yield from itertools.islice(items, count, None)
+
+    def chunks(self):
+        if isinstance(self.source, str):
+            yield self.source
+            return
+        self.source.seek(self.start)
+        while True:
+            chunk = self.source.read(self.CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def text(self):
+        return ''.join(self.chunks())
+
+    def to_score(self):
+        return Score(meter=self.meter, tempo=self.tempo, items=list(self))
+
+    def __repr__(self):
+        return "<LilypondStream {}>".format(
+            getattr(self.source, 'name', 'text'))
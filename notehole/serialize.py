@@ -0,0 +1,270 @@
+import functools
+import itertools
+import mmap
+import operator
+import struct
+import sys
+
+from array import array
+
+from notehole.music import (Score, PackedScore, Meter, Note, Rest, Chord, Tone,
+                            Duration)
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Binary score format, little-endian:
+#
+#   header   magic, version, flags, meter beats and bar, tempo, number of
+#            events and of records
+#   records  one fixed-width record per note or rest; a chord is a CHORD
+#            record holding its tone count in the pitch field, followed by
+#            that many TONE records
+#   index    the byte offset of every event in the records, for random
+#            access
+#
+# Bump VERSION whenever the layout changes.
+
+MAGIC = b'NHSC'
+VERSION = 1
+
+HEADER = struct.Struct('<4sHHHHdII')
+RECORD = struct.Struct('<BhbHB')
+INDEX = struct.Struct('<I')
+
+REST = 0
+NOTE = 1
+CHORD = 2
+TONE = 3
+
+TONE_ORDER = operator.attrgetter('pitch', 'accidental')
+
+# RECORD as a numpy dtype, for the bulk paths between records and the
+# columns of a PackedScore
+RECORD_FIELDS = [('kind', 'u1'), ('pitch', '<i2'), ('accidental', 'i1'),
+                 ('value', '<u2'), ('dots', 'u1')]
+
+
+def dumps(score):
+    if numpy is not None and isinstance(score, PackedScore):
+        records, index, events = encode_columns(score)
+    else:
+        records, index, events = encode_items(getattr(score, 'items', score))
+    header = HEADER.pack(MAGIC, VERSION, 0, score.meter.beats,
+                         score.meter.bar, score.tempo, events,
+                         len(records) // RECORD.size)
+    return b''.join((header, records, index))
+
+
+def encode_items(items):
+    # items are interned, so equal items are the same object: each distinct
+    # one is encoded once and looked up by id, which is cheaper than its hash
+    items = list(items)
+    keys = list(map(id, items))
+    encoded = {key: encode_item(item)
+               for key, item in dict(zip(keys, items)).items()}
+    records = list(map(encoded.__getitem__, keys))
+
+    index = array('I', itertools.accumulate(map(len, records), initial=0))
+    index.pop()
+    if sys.byteorder != 'little':
+        index.byteswap()
+    return b''.join(records), index.tobytes(), len(records)
+
+
+def encode_columns(packed):
+    # lays the columns out as records in bulk: each event record is followed
+    # by the tone records of its chord, a note record carries its tone
+    kinds = numpy.asarray(packed.kinds)
+    starts = numpy.asarray(packed.starts, numpy.int64)
+    pitches = numpy.asarray(packed.pitches)
+    accidentals = numpy.asarray(packed.accidentals)
+
+    counts = numpy.diff(starts, append=len(pitches))
+    chords = kinds == CHORD
+    notes = kinds == NOTE
+    sizes = numpy.where(chords, counts + 1, 1)
+    positions = numpy.cumsum(sizes) - sizes
+
+    records = numpy.zeros(int(sizes.sum()), numpy.dtype(RECORD_FIELDS))
+    records['kind'][positions] = kinds
+    records['value'][positions] = numpy.asarray(packed.values)
+    records['dots'][positions] = numpy.asarray(packed.dots)
+    records['pitch'][positions[notes]] = pitches[starts[notes]]
+    records['accidental'][positions[notes]] = accidentals[starts[notes]]
+    records['pitch'][positions[chords]] = counts[chords]
+
+    owners = numpy.repeat(numpy.arange(len(kinds)), counts)
+    tones = numpy.flatnonzero(chords[owners])
+    owners = owners[tones]
+    slots = positions[owners] + 1 + tones - starts[owners]
+    records['kind'][slots] = TONE
+    records['pitch'][slots] = pitches[tones]
+    records['accidental'][slots] = accidentals[tones]
+
+    index = (positions * RECORD.size).astype('<u4')
+    return records.tobytes(), index.tobytes(), len(kinds)
+
+
+def dump(score, fileobj):
+    fileobj.write(dumps(score))
+
+
+def loads(data):
+    return ScoreReader(data)
+
+
+def load(fileobj):
+    return ScoreReader(fileobj.read())
+
+
+def open_score(filename):
+    # maps the file instead of reading it, items are decoded on access
+    with open(filename, 'rb') as f:
+        return ScoreReader(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+@functools.lru_cache(maxsize=16384)
+def encode_item(item):
+    # items are interned, so most of them come out of this cache
+    duration = item.duration
+    if isinstance(item, Rest):
+        return RECORD.pack(REST, 0, 0, duration.value, duration.dots)
+    elif isinstance(item, Note):
+        return RECORD.pack(NOTE, item.tone.pitch, item.tone.accidental,
+                           duration.value, duration.dots)
+    elif isinstance(item, Chord):
+        # the order of Chord.sorted_tones(), without a method call per tone
+        tones = sorted(item.tones, key=TONE_ORDER, reverse=True)
+        return RECORD.pack(CHORD, len(tones), 0, duration.value,
+                           duration.dots) + b''.join(map(encode_tone, tones))
+    raise Exception('unknown item {}'.format(item))
+
+
+@functools.lru_cache(maxsize=1024)
+def encode_tone(tone):
+    return RECORD.pack(TONE, tone.pitch, tone.accidental, 0, 0)
+
+
+# a chord decodes several tones, most of them already seen
+decode_tone = functools.lru_cache(maxsize=1024)(Tone)
+
+
+class ScoreReader(object):
+    # A score decoded lazily from a buffer (bytes, memoryview or mmap)
+    # without copying it. It has the meter and tempo of a Score and can be
+    # handed to the exporters as it is.
+
+    def __init__(self, buffer):
+        self.buffer = memoryview(buffer)
+        if len(self.buffer) < HEADER.size:
+            raise ValueError('truncated score data')
+        (magic, version, _, beats, bar, tempo, self.events,
+         self.record_count) = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError('not a notehole score')
+        if version != VERSION:
+            raise ValueError('unsupported score format version {}'
+                             .format(version))
+
+        self.meter = Meter(beats, bar)
+        self.tempo = int(tempo) if tempo.is_integer() else tempo
+        self.records_offset = HEADER.size
+        self.index_offset = (self.records_offset +
+                             self.record_count * RECORD.size)
+        if len(self.buffer) < self.index_offset + self.events * INDEX.size:
+            raise ValueError('truncated score data')
+
+    def __len__(self):
+        return self.events
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.events
+        if not 0 <= index < self.events:
+            raise IndexError('item index out of range')
+        offset = INDEX.unpack_from(
+            self.buffer, self.index_offset + index * INDEX.size)[0]
+        return self.decode(self.records_offset + offset)
+
+    def decode(self, offset):
+        record = RECORD.unpack_from(self.buffer, offset)
+        if record[0] == CHORD:
+            record = (record,) + tuple(
+                RECORD.unpack_from(self.buffer, offset + n * RECORD.size)
+                for n in range(1, record[1] + 1))
+        return self.decode_record(record)
+
+    def __iter__(self):
+        # scores repeat the same few items, each distinct record is decoded
+        # once per pass
+        decoded = {}
+        records = RECORD.iter_unpack(
+            self.buffer[self.records_offset:self.index_offset])
+        for record in records:
+            if record[0] == CHORD:
+                record = (record,) + tuple(itertools.islice(records,
+                                                            record[1]))
+            item = decoded.get(record)
+            if item is None:
+                item = decoded[record] = self.decode_record(record)
+            yield item
+
+    def decode_record(self, record):
+        # a single record, or for a chord a tuple of its records
+        if isinstance(record[0], tuple):
+            (_, _, _, value, dots), tones = record[0], record[1:]
+            tones = [decode_tone(pitch, accidental)
+                     for kind, pitch, accidental, _, _ in tones
+                     if kind == TONE]
+            if len(tones) != len(record) - 1:
+                raise ValueError('malformed chord record')
+            return Chord(tones, Duration(value, dots))
+        kind, pitch, accidental, value, dots = record
+        if kind == NOTE:
+            return Note(decode_tone(pitch, accidental), Duration(value, dots))
+        elif kind == REST:
+            return Rest(Duration(value, dots))
+        raise ValueError('unexpected record kind {}'.format(kind))
+
+    def to_score(self):
+        return Score(meter=self.meter, tempo=self.tempo, items=list(self))
+
+    def to_packed(self):
+        # splits the records into PackedScore columns in bulk, without an
+        # object per item
+        if numpy is None or not self.events:
+            return PackedScore(self.meter, self.tempo, self)
+        records = numpy.frombuffer(self.buffer, numpy.dtype(RECORD_FIELDS),
+                                   self.record_count, self.records_offset)
+        kinds = records['kind']
+        if kinds.max() > TONE:
+            raise ValueError('unexpected record kind {}'.format(kinds.max()))
+        chords = records['pitch'][kinds == CHORD]
+        if (kinds == TONE).sum() != chords.sum():
+            raise ValueError('malformed chord record')
+
+        events = kinds != TONE
+        tones = (kinds == NOTE) | (kinds == TONE)
+        starts = numpy.cumsum(tones) - tones
+
+        packed = PackedScore(self.meter, self.tempo)
+        for column, values in ((packed.kinds, kinds[events]),
+                               (packed.values, records['value'][events]),
+                               (packed.dots, records['dots'][events]),
+                               (packed.starts, starts[events]),
+                               (packed.pitches, records['pitch'][tones]),
+                               (packed.accidentals,
+                                records['accidental'][tones])):
+            column.frombytes(values.astype(column.typecode).tobytes())
+        return packed
+
+    def release(self):
+        # drops the view, so that an mmap underneath can be closed
+        self.buffer.release()
+
+    def __repr__(self):
+        return "<ScoreReader {meter} @ {tempo}: {size} items>".format(
+            meter=repr(self.meter), tempo=self.tempo, size=len(self))
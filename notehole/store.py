@@ -0,0 +1,233 @@
+import mmap
+import os
+import struct
+
+from notehole import serialize
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# A store is a directory holding one generation of a data file and an index
+# file, named in CURRENT. The data file is the serialized scores back to
+# back. The index has one fixed-width entry per score id: the offset and
+# length of its data, and flags. Scores are only ever appended; compaction
+# writes the next generation and switches CURRENT over atomically, so
+# readers keep working on the generation they have mapped.
+
+ENTRY = struct.Struct('<QII')
+DELETED = 1
+
+CURRENT = 'CURRENT'
+LOCK_NAME = '.lock'
+
+
+class ScoreStore(object):
+
+    def __init__(self, directory, writable=False, sync=False):
+        self.directory = directory
+        self.writable = writable
+        self.sync = sync
+        self.generation = None
+        self.data_map = None
+        self.index_map = None
+        self.lock_file = None
+
+        if writable:
+            os.makedirs(directory, exist_ok=True)
+            self.lock()
+            if not os.path.exists(self.path(CURRENT)):
+                self.switch(0)
+        self.refresh()
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def lock(self):
+        # a single writer at a time, readers never lock
+        self.lock_file = open(self.path(LOCK_NAME), 'a')
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.lock_file.close()
+            raise RuntimeError('{} is open by another writer'
+                               .format(self.directory))
+
+    def switch(self, generation):
+        for name in ('data', 'index'):
+            open(self.path('{}-{}'.format(name, generation)), 'ab').close()
+        tmp_path = self.path(CURRENT + '.tmp')
+        with open(tmp_path, 'w') as f:
+            f.write(str(generation))
+            if self.sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path(CURRENT))
+
+    def refresh(self):
+        # picks up scores appended and compactions since the last call
+        with open(self.path(CURRENT)) as f:
+            generation = int(f.read())
+        if generation != self.generation:
+            self.generation = generation
+            self.data_map = self.index_map = None
+            if self.writable:
+                self.open_files()
+
+        self.data_map = self.remap(self.data_map, 'data')
+        self.index_map = self.remap(self.index_map, 'index')
+
+    def open_files(self):
+        if getattr(self, 'data_file', None):
+            self.data_file.close()
+            self.index_file.close()
+        self.data_file = open(self.file_path('data'), 'ab')
+        self.index_file = open(self.file_path('index'), 'ab', buffering=0)
+
+    def file_path(self, name):
+        return self.path('{}-{}'.format(name, self.generation))
+
+    def remap(self, current, name):
+        size = os.path.getsize(self.file_path(name))
+        if current is not None and len(current) == size:
+            return current
+        if not size:
+            return None
+        # views handed out keep the previous map alive until released
+        with open(self.file_path(name), 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        # number of ids given out, including deleted ones
+        return len(self.index_map) // ENTRY.size if self.index_map else 0
+
+    def entry(self, score_id):
+        if not 0 <= score_id < len(self):
+            self.refresh()
+            if not 0 <= score_id < len(self):
+                raise KeyError(score_id)
+        return ENTRY.unpack_from(self.index_map, score_id * ENTRY.size)
+
+    def __contains__(self, score_id):
+        try:
+            return not self.entry(score_id)[2] & DELETED
+        except KeyError:
+            return False
+
+    def __getitem__(self, score_id):
+        offset, length, flags = self.entry(score_id)
+        if flags & DELETED:
+            raise KeyError(score_id)
+        if self.data_map is None or offset + length > len(self.data_map):
+            self.refresh()
+        view = memoryview(self.data_map)[offset:offset + length]
+        return serialize.ScoreReader(view)
+
+    def get(self, score_id, default=None):
+        try:
+            return self[score_id]
+        except KeyError:
+            return default
+
+    def load(self, score_id):
+        return self[score_id].to_score()
+
+    def ids(self):
+        self.refresh()
+        for score_id in range(len(self)):
+            if not self.entry(score_id)[2] & DELETED:
+                yield score_id
+
+    def __iter__(self):
+        # lazy views, see scores() for Score objects
+        for score_id in self.ids():
+            yield self[score_id]
+
+    def scores(self):
+        for view in self:
+            yield view.to_score()
+
+    def append(self, score):
+        return self.extend([score])[0]
+
+    def extend(self, scores):
+        # data first, then the index entries in a single write: readers only
+        # see scores whose data is complete
+        self.check_writable()
+        offset = self.data_file.tell()
+        entries = []
+        for score in scores:
+            data = serialize.dumps(score)
+            self.data_file.write(data)
+            entries.append(ENTRY.pack(offset, len(data), 0))
+            offset += len(data)
+        self.flush(self.data_file)
+
+        first = len(self)
+        self.index_file.write(b''.join(entries))
+        self.flush(self.index_file)
+        self.refresh()
+        return list(range(first, first + len(entries)))
+
+    def delete(self, score_id):
+        self.check_writable()
+        offset, length, flags = self.entry(score_id)
+        with open(self.file_path('index'), 'r+b') as f:
+            f.seek(score_id * ENTRY.size)
+            f.write(ENTRY.pack(offset, length, flags | DELETED))
+            self.flush(f)
+
+    def compact(self):
+        # rewrites the live scores into a new generation, ids are kept
+        self.check_writable()
+        generation = self.generation + 1
+        data_path = self.path('data-{}'.format(generation))
+        index_path = self.path('index-{}'.format(generation))
+
+        with open(data_path, 'wb') as data, open(index_path, 'wb') as index:
+            offset = 0
+            for score_id in range(len(self)):
+                old_offset, length, flags = self.entry(score_id)
+                if flags & DELETED:
+                    index.write(ENTRY.pack(0, 0, flags))
+                    continue
+                data.write(self.data_map[old_offset:old_offset + length])
+                index.write(ENTRY.pack(offset, length, flags))
+                offset += length
+            self.flush(data)
+            self.flush(index)
+
+        old = (self.file_path('data'), self.file_path('index'))
+        self.switch(generation)
+        self.refresh()
+        for path in old:
+            os.remove(path)
+
+    def check_writable(self):
+        if not self.writable:
+            raise RuntimeError('store is open read-only')
+
+    def flush(self, f):
+        f.flush()
+        if self.sync:
+            os.fsync(f.fileno())
+
+    def close(self):
+        if self.writable:
+            self.data_file.close()
+            self.index_file.close()
+            self.lock_file.close()
+        self.data_map = self.index_map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __repr__(self):
+        return "<ScoreStore {} generation {}: {} ids>".format(
+            self.directory, self.generation, len(self))
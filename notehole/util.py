@@ -1,11 +1,71 @@
 import tempfile
 import os
 
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 from contextlib import contextmanager
 
 @contextmanager
 def tmp_filepath():
     fd, filepath = tempfile.mkstemp()
     os.close(fd)
-    yield filepath
-    os.remove(filepath)
+    try:
+        yield filepath
+    finally:
+        os.remove(filepath)
+
+
+@contextmanager
+def memory_filepath(data):
+    # yields a path to `data` and the file descriptors a child process must
+    # inherit to open it, backed by memory whenever the platform allows
+    if not hasattr(os, 'memfd_create'):
+        with tmp_filepath() as filepath:
+            with open(filepath, 'wb') as f:
+                f.write(data)
+            yield filepath, ()
+        return
+
+    fd = os.memfd_create('notehole')
+    try:
+        with open(fd, 'wb', closefd=False) as f:
+            f.write(data)
+        os.lseek(fd, 0, os.SEEK_SET)
+        yield '/dev/fd/{}'.format(fd), (fd,)
+    finally:
+        os.close(fd)
+
+
+def ordered_map(function, jobs, workers=None):
+    # map over a process pool with results in submission order
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(function, jobs)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for _, future in bounded_submit(executor, function, jobs, workers * 2):
+            yield future.result()
+
+
+def bounded_submit(executor, function, jobs, limit, ordered=True):
+    # submits function(job) for every job with at most `limit` in flight, so
+    # that jobs are only pulled, pickled and shipped shortly before a worker
+    # needs them. Yields (job, future) pairs once done, in submission order
+    # or, unless `ordered`, as they complete.
+    pending = {}
+    for job in jobs:
+        if len(pending) >= limit:
+            yield from _pop_done(pending, ordered)
+        pending[executor.submit(function, job)] = job
+    while pending:
+        yield from _pop_done(pending, ordered)
+
+
+def _pop_done(pending, ordered):
+    if ordered:
+        done = [next(iter(pending))]
+        wait(done)
+    else:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        yield pending.pop(future), future
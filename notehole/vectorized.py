@@ -0,0 +1,243 @@
+from array import array
+
+from notehole.music.packed import PackedScore, REST, NOTE, CHORD
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+COLUMNS = ('kinds', 'values', 'dots', 'starts', 'pitches', 'accidentals')
+
+
+def reverse(packed):
+    if numpy:
+        return _numpy_reverse(packed)
+    return _array_reverse(packed)
+
+
+def flip(packed, axis):
+    if numpy:
+        return _numpy_flip(packed, axis)
+    return _array_flip(packed, axis)
+
+
+def rotate_180(packed, axis):
+    return flip(reverse(packed), axis)
+
+
+def horizontal_fold(packed, axis):
+    if numpy:
+        return _numpy_fold(packed, axis)
+    return _array_fold(packed, axis)
+
+
+def vertical_fold(packed, repeats=1):
+    blocks = (packed, reverse(packed))
+    return concatenate(packed, (blocks[i % 2] for i in range(repeats + 1)))
+
+
+def mobius_fold(packed, axis, repeats=1):
+    blocks = (packed, flip(packed, axis))
+    return concatenate(packed, (blocks[i % 2] for i in range(repeats + 1)))
+
+
+def concatenate(template, blocks):
+    result = _empty(template)
+    for block in blocks:
+        offset = len(result.pitches)
+        for name in ('kinds', 'values', 'dots', 'pitches', 'accidentals'):
+            getattr(result, name).extend(getattr(block, name))
+        if offset:
+            result.starts.extend(s + offset for s in block.starts)
+        else:
+            result.starts.extend(block.starts)
+    return result
+
+
+def _empty(template):
+    return PackedScore(template.meter, template.tempo)
+
+
+def _array_reverse(packed):
+    result = _empty(packed)
+    for index in reversed(range(len(packed))):
+        start, end = packed.tone_range(index)
+        result.kinds.append(packed.kinds[index])
+        result.values.append(packed.values[index])
+        result.dots.append(packed.dots[index])
+        result.starts.append(len(result.pitches))
+        result.pitches.extend(packed.pitches[start:end])
+        result.accidentals.extend(packed.accidentals[start:end])
+    return result
+
+
+def _array_flip(packed, axis):
+    result = _empty(packed)
+    result.kinds = array('b', packed.kinds)
+    result.values = array('H', packed.values)
+    result.dots = array('B', packed.dots)
+    result.starts = array('I', packed.starts)
+
+    double = axis.pitch * 2
+    pitches = array('h', (double - p for p in packed.pitches))
+    accidentals = array('b', (-a for a in packed.accidentals))
+
+    # flipping reverses the pitch order of every chord
+    for index, kind in enumerate(packed.kinds):
+        if kind == CHORD:
+            start, end = packed.tone_range(index)
+            pitches[start:end] = pitches[start:end][::-1]
+            accidentals[start:end] = accidentals[start:end][::-1]
+
+    result.pitches = pitches
+    result.accidentals = accidentals
+    return result
+
+
+def _array_fold(packed, axis):
+    result = _empty(packed)
+    double = axis.pitch * 2
+    pitches = packed.pitches
+    accidentals = packed.accidentals
+
+    for index, kind in enumerate(packed.kinds):
+        start, end = packed.tone_range(index)
+
+        if kind == NOTE and (pitches[start], accidentals[start]) == \
+                (axis.pitch, axis.accidental):
+            tones = [(pitches[start], accidentals[start])]
+        elif kind != REST:
+            kind = CHORD
+            tones = set()
+            for position in range(start, end):
+                pitch, accidental = pitches[position], accidentals[position]
+                tones.add((pitch, accidental))
+                tones.add((double - pitch, -accidental))
+            tones = sorted(tones, reverse=True)
+        else:
+            tones = ()
+
+        result.kinds.append(kind)
+        result.values.append(packed.values[index])
+        result.dots.append(packed.dots[index])
+        result.starts.append(len(result.pitches))
+        for pitch, accidental in tones:
+            result.pitches.append(pitch)
+            result.accidentals.append(accidental)
+
+    return result
+
+
+def _to_numpy(column):
+    signed = 'i' if column.typecode.islower() else 'u'
+    dtype = numpy.dtype('{}{}'.format(signed, column.itemsize))
+    return numpy.frombuffer(column, dtype=dtype)
+
+
+def _from_numpy(values, typecode):
+    column = array(typecode)
+    signed = 'i' if typecode.islower() else 'u'
+    dtype = numpy.dtype('{}{}'.format(signed, column.itemsize))
+    column.frombytes(numpy.ascontiguousarray(values, dtype=dtype).tobytes())
+    return column
+
+
+def _numpy_columns(packed):
+    return {name: _to_numpy(getattr(packed, name)) for name in COLUMNS}
+
+
+def _numpy_packed(template, columns):
+    result = _empty(template)
+    for name in COLUMNS:
+        column = getattr(result, name)
+        setattr(result, name, _from_numpy(columns[name], column.typecode))
+    return result
+
+
+def _numpy_sizes(columns):
+    starts = columns['starts'].astype(numpy.int64)
+    ends = numpy.append(starts[1:], len(columns['pitches']))
+    return starts, ends - starts
+
+
+def _numpy_reverse(packed):
+    columns = _numpy_columns(packed)
+    starts, sizes = _numpy_sizes(columns)
+
+    old_starts = starts[::-1]
+    sizes = sizes[::-1]
+    new_starts = numpy.cumsum(sizes) - sizes
+    source = numpy.repeat(old_starts - new_starts, sizes)
+    source += numpy.arange(len(source))
+
+    return _numpy_packed(packed, {
+        'kinds': columns['kinds'][::-1],
+        'values': columns['values'][::-1],
+        'dots': columns['dots'][::-1],
+        'starts': new_starts,
+        'pitches': columns['pitches'][source],
+        'accidentals': columns['accidentals'][source],
+    })
+
+
+def _numpy_flip(packed, axis):
+    columns = _numpy_columns(packed)
+    starts, sizes = _numpy_sizes(columns)
+
+    # flipping reverses the pitch order of every chord
+    ends = starts + sizes
+    source = numpy.repeat(starts + ends - 1, sizes)
+    source -= numpy.arange(len(source))
+
+    pitches = axis.pitch * 2 - columns['pitches'].astype(numpy.int64)
+    accidentals = -columns['accidentals'].astype(numpy.int64)
+
+    columns['pitches'] = pitches[source]
+    columns['accidentals'] = accidentals[source]
+    return _numpy_packed(packed, columns)
+
+
+def _numpy_fold(packed, axis):
+    columns = _numpy_columns(packed)
+    starts, sizes = _numpy_sizes(columns)
+    kinds = columns['kinds']
+    pitches = columns['pitches'].astype(numpy.int64)
+    accidentals = columns['accidentals'].astype(numpy.int64)
+
+    first = numpy.minimum(starts, max(len(pitches) - 1, 0))
+    on_axis = (kinds == NOTE)
+    if len(pitches):
+        on_axis &= (pitches[first] == axis.pitch)
+        on_axis &= (accidentals[first] == axis.accidental)
+
+    events = numpy.repeat(numpy.arange(len(kinds)), sizes)
+    mirrored = ~on_axis[events]
+
+    candidate_events = numpy.concatenate((events, events[mirrored]))
+    candidate_pitches = numpy.concatenate(
+        (pitches, axis.pitch * 2 - pitches[mirrored]))
+    candidate_accidentals = numpy.concatenate(
+        (accidentals, -accidentals[mirrored]))
+
+    # order tones by event, then from highest to lowest like Chord.sorted_tones
+    keys = candidate_pitches * 256 + candidate_accidentals
+    order = numpy.lexsort((-keys, candidate_events))
+    candidate_events = candidate_events[order]
+    keys = keys[order]
+
+    unique = numpy.ones(len(keys), dtype=bool)
+    unique[1:] = ((candidate_events[1:] != candidate_events[:-1]) |
+                  (keys[1:] != keys[:-1]))
+    order = order[unique]
+
+    new_sizes = numpy.bincount(candidate_events[unique],
+                               minlength=len(kinds))
+    new_kinds = numpy.where(kinds == REST, REST,
+                            numpy.where(on_axis, NOTE, CHORD))
+
+    columns['kinds'] = new_kinds
+    columns['starts'] = numpy.cumsum(new_sizes) - new_sizes
+    columns['pitches'] = candidate_pitches[order]
+    columns['accidentals'] = candidate_accidentals[order]
+    return _numpy_packed(packed, columns)
@@ -10,5 +10,6 @@ setup(
         author='Gregory Eric Sanderson',
         author_email='gregory.eric.sanderson@gmail.com',
         packages = find_packages(),
-        install_requires=requirements
+        install_requires=requirements,
+        extras_require={'fast': ['numpy'], 'mido': ['mido']}
 )
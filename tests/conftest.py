@@ -0,0 +1,103 @@
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+from notehole.music import Score, parse_note
+
+# Stand-ins for the external binaries. Each call is logged as a JSON line
+# with its arguments, then takes STUB_DELAY seconds. Inputs in 7/8 fail, like
+# a file the real tool rejects. fluidsynth writes its header first, so a run
+# that fails or is killed leaves a partial file.
+STUB = """#!{python}
+import json, os, sys, time
+
+name = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+with open(os.environ['STUB_LOG'], 'a') as log:
+    log.write(json.dumps([name] + args) + '\\n')
+if name == 'fluidsynth' and args[args.index('-F') + 1] != '/dev/stdout':
+    with open(args[args.index('-F') + 1], 'wb') as f:
+        f.write(b'WAV')
+time.sleep(float(os.environ.get('STUB_DELAY', 0)))
+
+def failing(data):
+    return b'\\\\time 7/8' in data or b'\\xff\\x58\\x04\\x07\\x03' in data
+
+if name == 'lilypond':
+    output = args[args.index('-o') + 1]
+    status = 0
+    for path in args[args.index('-o') + 2:]:
+        with open(path, 'rb') as f:
+            data = f.read()
+        if failing(data):
+            status = 1
+            continue
+        if os.path.isdir(output):
+            base = os.path.splitext(os.path.basename(path))[0]
+            target = os.path.join(output, base + '.png')
+        else:
+            target = output + '.png'
+        with open(target, 'wb') as f:
+            f.write(b'PNG' + data)
+    sys.exit(status)
+
+elif name == 'fluidsynth':
+    output = args[args.index('-F') + 1]
+    soundfont = [a for a in args if a.endswith('.sf2')][0]
+    with open(args[args.index(soundfont) + 1], 'rb') as f:
+        data = f.read()
+    if failing(data):
+        sys.exit(1)
+    pcm = bytes(4096) + data
+    if output == '/dev/stdout':
+        sys.stdout.buffer.write(pcm)
+    else:
+        with open(output, 'ab') as f:
+            f.write(pcm)
+
+elif name == 'lame':
+    data = sys.stdin.buffer.read()
+    sys.stdout.buffer.write(b'MP3' + len(data).to_bytes(4, 'little'))
+"""
+
+BINARIES = ('lilypond', 'fluidsynth', 'lame')
+
+NOTES = ('C4-4', 'E4-8', 'r-8', 'G4-2')
+
+
+def make_score(notes=NOTES, meter=None, tempo=120):
+    # the score most tests need, from notes written as for parse_note
+    return Score(meter, tempo, [parse_note(n) for n in notes])
+
+
+class Stubs(object):
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.log = os.path.join(directory, 'calls.log')
+
+    def calls(self, name=None):
+        if not os.path.exists(self.log):
+            return []
+        with open(self.log) as f:
+            calls = [json.loads(line) for line in f]
+        return [c for c in calls if name is None or c[0] == name]
+
+    def remove(self, name):
+        os.remove(os.path.join(self.directory, name))
+
+
+@pytest.fixture
+def stubs(tmp_path, monkeypatch):
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    for name in BINARIES:
+        path = directory / name
+        path.write_text(STUB.format(python=sys.executable))
+        path.chmod(path.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv('PATH', str(directory), prepend=os.pathsep)
+    monkeypatch.setenv('STUB_LOG', str(directory / 'calls.log'))
+    return Stubs(str(directory))
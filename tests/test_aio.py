@@ -0,0 +1,43 @@
+import asyncio
+import os
+import subprocess
+
+import pytest
+
+from notehole.export import aio
+from notehole.music import Meter
+
+from conftest import make_score
+
+
+@pytest.mark.parametrize('create', [aio.create_wav_file, aio.create_mp3_file])
+def test_create(stubs, tmp_path, create):
+    filename = str(tmp_path / 'out')
+    asyncio.run(create(make_score(), filename))
+    assert os.path.getsize(filename)
+
+
+@pytest.mark.parametrize('create', [aio.create_wav_file, aio.create_mp3_file])
+def test_failure_leaves_no_output(stubs, tmp_path, create):
+    filename = str(tmp_path / 'out')
+    with pytest.raises(subprocess.CalledProcessError):
+        asyncio.run(create(make_score(meter=Meter(7, 8)), filename))
+    assert not os.path.exists(filename)
+
+
+@pytest.mark.parametrize('create', [aio.create_wav_file, aio.create_mp3_file])
+def test_cancel_leaves_no_output(stubs, tmp_path, monkeypatch, create):
+    monkeypatch.setenv('STUB_DELAY', '5')
+    filename = str(tmp_path / 'out')
+
+    async def cancel():
+        task = asyncio.ensure_future(create(make_score(), filename))
+        while not stubs.calls('fluidsynth'):
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel())
+    assert not os.path.exists(filename)
@@ -0,0 +1,65 @@
+import os
+import subprocess
+
+import pytest
+
+from notehole.export import render_batch
+from notehole.music import Meter
+
+from conftest import make_score
+
+FORMATS = ['ly', 'mid', 'wav', 'mp3', 'png']
+
+
+def test_results_in_order(stubs, tmp_path):
+    scores = [make_score(notes=('C4-4',) * (n + 1)) for n in range(5)]
+    results = render_batch(scores, FORMATS, str(tmp_path), workers=3)
+
+    assert [(r.index, r.format) for r in results] == \
+        [(i, fmt) for i in range(5) for fmt in FORMATS]
+    for result in results:
+        assert result.ok, result
+        assert result.filename == os.path.join(
+            str(tmp_path), '{}.{}'.format(result.index, result.format))
+        assert os.path.getsize(result.filename)
+
+    assert len(stubs.calls('lilypond')) == 5
+    # wav through fluidsynth alone, mp3 through fluidsynth and lame
+    assert len(stubs.calls('fluidsynth')) == 10
+    assert len(stubs.calls('lame')) == 5
+
+
+def test_errors_are_per_item(stubs, tmp_path):
+    scores = [make_score(), make_score(meter=Meter(7, 8)), make_score()]
+    results = render_batch(scores, FORMATS, str(tmp_path), workers=2)
+
+    failed = [(r.index, r.format) for r in results if not r.ok]
+    assert failed == [(1, 'wav'), (1, 'mp3'), (1, 'png')]
+    for result in results:
+        if not result.ok:
+            assert isinstance(result.error, subprocess.CalledProcessError)
+        else:
+            assert os.path.exists(result.filename)
+
+
+def test_progress(stubs, tmp_path):
+    calls = []
+    scores = [make_score() for _ in range(4)]
+    results = render_batch(scores, ['ly', 'png'], str(tmp_path), workers=2,
+                           progress=lambda done, r: calls.append((done, r)))
+
+    assert [done for done, _ in calls] == list(range(1, 9))
+    assert {id(r) for _, r in calls} == {id(r) for r in results}
+
+
+def test_missing_binary(stubs, tmp_path):
+    stubs.remove('lilypond')
+    results = render_batch([make_score()], ['mid', 'png'], str(tmp_path),
+                           workers=1)
+    assert results[0].ok
+    assert isinstance(results[1].error, OSError)
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        render_batch([make_score()], ['pdf'], str(tmp_path))
@@ -0,0 +1,63 @@
+import os
+
+from notehole.export import create_lilypond_file
+from notehole.export.cache import RenderCache
+
+from conftest import make_score
+
+# the last two render to files of the same size
+SCORES = [make_score(), make_score(('A3-1',)), make_score(('B3-1',))]
+
+
+def age(path, seconds):
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+
+def test_hits_and_misses(tmp_path):
+    cache = RenderCache(str(tmp_path / 'cache'))
+    filename = str(tmp_path / 'a.ly')
+    cache.render(SCORES[0], 'ly', filename)
+    cache.render(SCORES[0], 'ly', filename)
+    cache.render(SCORES[0], 'mid', str(tmp_path / 'a.mid'))
+    cache.render(SCORES[1], 'ly', str(tmp_path / 'b.ly'))
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 3, 3)
+    assert stats['size'] == cache.size()
+
+    expected = str(tmp_path / 'expected.ly')
+    create_lilypond_file(SCORES[0], expected)
+    with open(filename) as a, open(expected) as b:
+        assert a.read() == b.read()
+
+    # a new cache over the same directory starts from the stored entries
+    again = RenderCache(str(tmp_path / 'cache'))
+    assert again.path(SCORES[1], 'ly') == cache.path(SCORES[1], 'ly')
+    assert (again.hits, again.misses) == (1, 0)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path / 'cache'))
+    first, second = [cache.path(score, 'ly') for score in SCORES[:2]]
+    age(first, 200)
+    age(second, 100)
+    # a hit makes the first one the most recent
+    assert cache.path(SCORES[0], 'ly') == first
+
+    cache.max_size = cache.size() + 1
+    third = cache.path(SCORES[2], 'ly')
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+    assert cache.size() <= cache.max_size
+
+
+def test_keeps_the_new_entry(tmp_path):
+    cache = RenderCache(str(tmp_path / 'cache'), max_size=1)
+    paths = [cache.path(score, 'ly') for score in SCORES]
+    # over the limit on its own, the newest entry still stays
+    assert [os.path.exists(path) for path in paths] == [False, False, True]
+    assert cache.stats()['entries'] == 1
+
+    cache.clear()
+    assert cache.stats()['entries'] == 0
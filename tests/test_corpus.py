@@ -0,0 +1,65 @@
+import os
+import sys
+
+from notehole.parse import ParseError, parse_lilypond, load_corpus
+from notehole.parse.corpus import cache_key, store_cached
+
+TEXTS = (
+    "\\relative c' { \\time 3/4 c4 d8. e16 <c e g>2 r4 }",
+    "{ c4 \\clef bass d }",
+    "\\relative { e'2 f g1 }",
+)
+
+
+def write_corpus(directory):
+    paths = []
+    for index, text in enumerate(TEXTS):
+        path = os.path.join(directory, '{}.ly'.format(index))
+        with open(path, 'w') as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def test_results_and_errors_per_file(tmp_path):
+    paths = write_corpus(str(tmp_path))
+    paths.insert(1, str(tmp_path / 'missing.ly'))
+    results = load_corpus(paths, workers=2)
+
+    assert [r.path for r in results] == paths
+    assert [r.ok for r in results] == [True, False, False, True]
+    assert isinstance(results[1].error, OSError)
+    assert isinstance(results[2].error, ParseError)
+    assert list(results[3].score) == list(parse_lilypond(TEXTS[2]))
+
+
+def test_cache(tmp_path):
+    paths = write_corpus(str(tmp_path))
+    cache_dir = str(tmp_path / 'cache')
+
+    first = load_corpus(paths, workers=2, cache_dir=cache_dir)
+    second = load_corpus(paths, workers=2, cache_dir=cache_dir)
+    assert [r.cached for r in first] == [False, False, False]
+    assert [r.cached for r in second] == [True, False, True]
+    for a, b in zip(first, second):
+        assert a.ok == b.ok
+        if a.ok:
+            assert list(a.score) == list(b.score)
+
+
+class Renamed(object):
+    pass
+
+
+def test_stale_cache_entry_is_a_miss(tmp_path, monkeypatch):
+    paths = write_corpus(str(tmp_path))
+    cache_dir = str(tmp_path / 'cache')
+    with open(paths[0], 'rb') as f:
+        key = cache_key(f.read())
+    store_cached(cache_dir, key, Renamed())
+    # the entry now references a class that is gone
+    monkeypatch.delattr(sys.modules[__name__], 'Renamed')
+
+    results = load_corpus(paths, workers=1, cache_dir=cache_dir)
+    assert results[0].ok and not results[0].cached
+    assert list(results[0].score) == list(parse_lilypond(TEXTS[0]))
@@ -0,0 +1,106 @@
+import collections
+import os
+import subprocess
+
+import pytest
+
+from notehole.export import graphic
+from notehole.export.graphic import PngRenderPool, create_png_file
+from notehole.music import Meter
+
+from conftest import make_score
+
+TIMEOUT = 30
+
+
+def submit_all(pool, directory, scores):
+    return [pool.submit(score, os.path.join(directory, '{}.png'.format(i)))
+            for i, score in enumerate(scores)]
+
+
+def inputs(call):
+    return call[call.index('-o') + 2:]
+
+
+def test_create_png_file(stubs, tmp_path):
+    filename = str(tmp_path / 'score.png')
+    create_png_file(make_score(), filename)
+    with open(filename, 'rb') as f:
+        assert f.read().startswith(b'PNG')
+
+
+def test_pool_batches_queued_jobs(stubs, tmp_path, monkeypatch):
+    # while the first run is busy the rest queue up and go in batches
+    monkeypatch.setenv('STUB_DELAY', '0.3')
+    with PngRenderPool(workers=1, batch_size=4) as pool:
+        futures = submit_all(pool, str(tmp_path), [make_score()] * 10)
+        for future in futures:
+            assert os.path.exists(future.result(TIMEOUT))
+
+    calls = stubs.calls('lilypond')
+    assert sum(len(inputs(call)) for call in calls) == 10
+    assert all(len(inputs(call)) <= 4 for call in calls)
+    assert len(calls) < 10
+
+
+def test_pool_fails_only_the_failing_job(stubs, tmp_path, monkeypatch):
+    monkeypatch.setenv('STUB_DELAY', '0.3')
+    scores = [make_score(), make_score(), make_score(meter=Meter(7, 8)), make_score()]
+    with PngRenderPool(workers=1) as pool:
+        futures = submit_all(pool, str(tmp_path), scores)
+        with pytest.raises(subprocess.CalledProcessError):
+            futures[2].result(TIMEOUT)
+        for index in (0, 1, 3):
+            assert os.path.exists(futures[index].result(TIMEOUT))
+
+
+def test_pool_recycles_workers(stubs, tmp_path):
+    with PngRenderPool(workers=1, max_jobs=3) as pool:
+        futures = submit_all(pool, str(tmp_path), [make_score()] * 10)
+        for future in futures:
+            future.result(TIMEOUT)
+        assert len([t for t in pool.threads if t.is_alive()]) == 1
+
+    # each worker renders in its own scratch directory
+    per_directory = collections.Counter()
+    for call in stubs.calls('lilypond'):
+        per_directory[call[call.index('-o') + 1]] += len(inputs(call))
+    assert len(per_directory) >= 4
+    assert max(per_directory.values()) <= 3
+
+
+def test_close_drains_the_queue(stubs, tmp_path, monkeypatch):
+    monkeypatch.setenv('STUB_DELAY', '0.1')
+    pool = PngRenderPool(workers=2, max_jobs=1)
+    futures = submit_all(pool, str(tmp_path), [make_score()] * 8)
+    pool.close()
+
+    assert all(future.done() for future in futures)
+    for future in futures:
+        assert os.path.exists(future.result(0))
+    assert not any(t.is_alive() for t in pool.threads)
+    with pytest.raises(RuntimeError):
+        pool.submit(make_score(), str(tmp_path / 'late.png'))
+
+
+def test_pool_survives_a_failing_batch(stubs, tmp_path, monkeypatch):
+    def broken(ly_filepaths, directory):
+        raise RuntimeError('broken')
+
+    command = graphic.batch_png_command
+    with PngRenderPool(workers=1) as pool:
+        monkeypatch.setattr(graphic, 'batch_png_command', broken)
+        future = pool.submit(make_score(), str(tmp_path / 'a.png'))
+        with pytest.raises(RuntimeError):
+            future.result(TIMEOUT)
+
+        monkeypatch.setattr(graphic, 'batch_png_command', command)
+        future = pool.submit(make_score(), str(tmp_path / 'b.png'))
+        assert os.path.exists(future.result(TIMEOUT))
+
+
+def test_pool_missing_binary(stubs, tmp_path):
+    stubs.remove('lilypond')
+    with PngRenderPool(workers=1) as pool:
+        with pytest.raises(OSError):
+            pool.render(make_score(), str(tmp_path / 'a.png'))
@@ -0,0 +1,53 @@
+from fractions import Fraction
+
+import pytest
+
+from notehole.export import render_lilypond, create_multistaff_lilypond_file
+from notehole.export.lilypond import STAVES_TEMPLATE, _format_staff
+from notehole.music import Score, Meter, Tone, Note, Duration
+from notehole.parse import parse_lilypond
+
+from conftest import make_score
+
+MELODY = ('C4-4', 'E4-8', 'r-8', 'G4-4', 'C5-4',
+          'B4-8', 'G4-8', 'E4-4', 'C4-2',
+          'D4-4.', 'F4-8', 'A4-4', 'D5-4')
+
+
+def test_round_trip():
+    score = make_score(MELODY)
+    assert list(parse_lilypond(render_lilypond(score))) == list(score)
+
+
+def test_leaps_keep_their_octave():
+    tones = [Tone.with_octave(pitch, octave) for pitch, octave
+             in ((0, 3), (4, 3), (0, 4), (5, 2), (1, 4))]
+    score = Score(items=[Note(tone, Duration(4)) for tone in tones])
+    assert list(parse_lilypond(render_lilypond(score))) == list(score)
+
+
+def test_window_with_pickup_parses_back():
+    score = make_score(MELODY)
+    # starts on the second beat of the first measure
+    text = render_lilypond(score, time=(Fraction(1, 4), Fraction(3, 2)))
+    assert '\\partial 4*3' in text
+    assert list(parse_lilypond(text)) == score.items[1:8]
+
+
+def test_multistaff_writes_staves_in_order(tmp_path):
+    scores = [make_score(MELODY), make_score(('A3-1',))]
+    filename = str(tmp_path / 'multi.ly')
+    create_multistaff_lilypond_file(scores, filename, extra='% end', workers=2)
+    with open(filename) as f:
+        text = f.read()
+
+    staves = [_format_staff(score) for score in scores]
+    assert text == STAVES_TEMPLATE.format(staves='\n'.join(staves),
+                                          extra='% end')
+    assert text.index('\\relative c\'') < text.index('\\relative a {')
+
+
+def test_multistaff_staves_share_a_meter(tmp_path):
+    scores = [make_score(MELODY), make_score(('A3-2.',), Meter(3, 4))]
+    with pytest.raises(ValueError):
+        create_multistaff_lilypond_file(scores, str(tmp_path / 'multi.ly'))
@@ -0,0 +1,132 @@
+import io
+import random
+
+import pytest
+
+from notehole.export import create_midi_file, create_multitrack_midi_file
+from notehole.export import create_multistaff_lilypond_file
+from notehole.export.midi import MidiExporter, MidiEncoder, MidiStreamWriter
+from notehole.music import Score, Meter, Chord, Duration, parse_note
+from notehole.music import parse_tone
+from notehole.operations import vertical_fold, mobius_fold
+
+from conftest import make_score
+
+mido = pytest.importorskip('mido')
+
+
+def notes(track):
+    return [(m.type, m.note, m.time) for m in track
+            if m.type in ('note_on', 'note_off')]
+
+
+def test_one_track_per_score(tmp_path):
+    scores = [make_score(), make_score(('A3-2', 'B3-2')), make_score(('r-1',))]
+    filename = str(tmp_path / 'multi.mid')
+    create_multitrack_midi_file(scores, filename, workers=2)
+
+    multi = mido.MidiFile(filename)
+    assert multi.type == 1
+    assert len(multi.tracks) == len(scores) + 1
+    for index, score in enumerate(scores):
+        single_filename = str(tmp_path / '{}.mid'.format(index))
+        create_midi_file(score, single_filename)
+        single = mido.MidiFile(single_filename)
+        assert notes(multi.tracks[index + 1]) == notes(single.tracks[0])
+    channels = [{m.channel for m in track if m.type == 'note_on'}
+                for track in multi.tracks[1:3]]
+    assert channels == [{0}, {1}]
+
+
+def test_tracks_share_the_tempo_map(tmp_path):
+    filename = str(tmp_path / 'multi.mid')
+    with pytest.raises(ValueError):
+        create_multitrack_midi_file([make_score(), make_score(tempo=90)],
+                                    filename)
+    with pytest.raises(ValueError):
+        create_multitrack_midi_file([make_score(),
+                                     make_score(meter=Meter(3, 4))], filename)
+
+
+def test_no_scores(tmp_path):
+    with pytest.raises(ValueError):
+        create_multitrack_midi_file([], str(tmp_path / 'multi.mid'))
+    with pytest.raises(ValueError):
+        create_multistaff_lilypond_file([], str(tmp_path / 'multi.ly'))
+
+
+def long_score(length, seed=0):
+    rng = random.Random(seed)
+    notes = ['{}{}-{}'.format(rng.choice('CDEFGAB'), rng.randint(2, 6),
+                              rng.choice((1, 2, 4, 8, 16)))
+             for _ in range(length)]
+    return make_score(notes)
+
+
+def stream(score):
+    f = io.BytesIO()
+    writer = MidiStreamWriter(f)
+    writer.append(score)
+    writer.close()
+    # the buffer only ever grows, so its final size is its peak
+    return f.getvalue(), len(writer.data)
+
+
+def in_memory(score):
+    encoder = MidiEncoder()
+    encoder.append(score)
+    return encoder.to_bytes()
+
+
+def test_stream_buffer_stays_bounded():
+    score = long_score(100000)
+    data, size = stream(score)
+    assert size <= MidiStreamWriter.BUFFER_SIZE
+    assert data == in_memory(score)
+
+
+def test_stream_replays_blocks_larger_than_the_buffer():
+    score = long_score(20000)
+    folded = Score(score.meter, score.tempo, vertical_fold(score.items, 3))
+    data, size = stream(folded)
+    assert size <= MidiStreamWriter.BUFFER_SIZE
+    assert data == in_memory(folded)
+
+
+def with_mido(score):
+    exporter = MidiExporter()
+    exporter.append(score)
+    mid = mido.MidiFile(type=exporter.FILETYPE, ticks_per_beat=exporter.TICK)
+    mid.tracks.append(exporter.track)
+    f = io.BytesIO()
+    mid.save(file=f)
+    return f.getvalue()
+
+
+def chord(*tones, value=4):
+    return Chord([parse_tone(t) for t in tones], Duration(value))
+
+
+@pytest.mark.parametrize('meter, tempo', [
+    (None, 120),
+    (Meter(3, 4), 120),
+    (Meter(6, 8), 70),  # 857142.86 us per beat, rounded
+    (Meter(5, 16), 333),
+])
+def test_encoder_matches_mido(meter, tempo):
+    items = [parse_note(n) for n in ('r-1', 'r-1', 'C4-4', 'r-2.', 'E4-8')]
+    items += [chord('C4', 'E4', 'G4'), parse_note('r-1'),
+              chord('A3', 'C#5', value=1), parse_note('Bb2-16')]
+    items += [parse_note(n) for n in ('r-1',) * 3]
+    score = Score(meter, tempo, items)
+    assert in_memory(score) == with_mido(score)
+
+
+@pytest.mark.parametrize('fold', [vertical_fold, mobius_fold])
+def test_encoder_replays_repeated_like_mido(fold):
+    # blocks that start and end on rests carry their ticks across repeats
+    items = [parse_note('r-2'), chord('C4', 'G4'), parse_note('D4-8'),
+             parse_note('r-1')]
+    for block in (items, [parse_note('r-1')] * 3):
+        score = Score(Meter(3, 4), 90, fold(tuple(block), 4))
+        assert in_memory(score) == with_mido(score)
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from notehole.export import render_lilypond
+from notehole.export.midi import MidiEncoder
+from notehole.music import Meter
+from notehole.parse import parse_lilypond, iter_lilypond, ParseError
+from notehole.parse.lilypond import (LilypondParser, FastLilypondParser,
+                                     default_converters)
+
+TEXTS = (
+    "\\relative c' { \\time 3/4 c4 d8. e16 <c e g>2 r4 f,, g'' }",
+    "\\relative { r2 <e g> c'4 % comment\n b, }",
+    "\\version \"2.18.2\"\n{ c4 cis' des,, <c e g>1 r8.. }\n",
+    "\\relative c'' { \\time 3/4 \\partial 8*3 c d4 \\partial4 e }",
+    "\\relative c' { c4 d',4 }",
+    "\\relative c' { <c e',>4 g }",
+)
+
+# mixed octave marks are left to python-ly
+FALLBACK = TEXTS[-2:]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_fast_parser_matches_python_ly(text):
+    fast = FastLilypondParser().parse(text)
+    full = LilypondParser(default_converters()).parse(text)
+    if text in FALLBACK:
+        assert fast is None
+        fast = parse_lilypond(text)
+    assert fast.meter == full.meter
+    assert list(fast) == list(full)
+
+
+def test_unsupported_input_falls_back_quickly():
+    # a single regex over the body used to backtrack exponentially on the
+    # indentation before giving up
+    lines = '\n'.join('    c4 d e f' for _ in range(200))
+    text = "\\relative c' {\n" + lines + '\n    \\bar "|."\n}\n'
+
+    start = time.perf_counter()
+    assert FastLilypondParser().parse(text) is None
+    with pytest.raises(ParseError):
+        parse_lilypond(text)
+    assert time.perf_counter() - start < 5
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64 * 1024])
+@pytest.mark.parametrize('text', TEXTS)
+def test_stream_matches_parse(tmp_path, text, chunk_size):
+    path = tmp_path / 'score.ly'
+    path.write_text(text)
+    with open(str(path)) as f:
+        stream = iter_lilypond(f)
+        stream.CHUNK_SIZE = chunk_size
+        score = parse_lilypond(text)
+        assert stream.meter == score.meter
+        assert list(stream) == list(score)
+        # a second pass reads the file again
+        assert list(stream) == list(score)
+
+
+def test_stream_falls_back_where_the_fast_path_stops():
+    # python-ly takes over at \\bar, without repeating the first items
+    text = "{ c4 d e f g \\bar \"|.\" }"
+    stream = iter_lilypond(text)
+    items = iter(stream)
+    assert [next(items) for _ in range(5)] == \
+        list(parse_lilypond("{ c4 d e f g }"))
+    with pytest.raises(ParseError):
+        next(items)
+
+    text = "{ \\time 3/8 c4 d e \\clef bass }"
+    assert iter_lilypond(text).meter == Meter(3, 8)
+
+
+def test_stream_feeds_the_exporters():
+    text = "\\relative c' { \\time 3/4 c4 e g <c e>2. }"
+    score = parse_lilypond(text)
+
+    encoder = MidiEncoder()
+    encoder.append(iter_lilypond(text))
+    expected = MidiEncoder()
+    expected.append(score)
+    assert encoder.to_bytes() == expected.to_bytes()
+
+    assert render_lilypond(iter_lilypond(text)) == render_lilypond(score)
@@ -0,0 +1,27 @@
+from notehole import operations
+from notehole.music import Score, TimeIndex, parse_note
+
+NOTES = ('C4-4', 'E4-8', 'r-8', 'G4-2.', 'C5-16')
+
+
+def make_items():
+    return [parse_note(n) for n in NOTES]
+
+
+def test_time_index_catches_up():
+    score = Score(items=make_items())
+    index = score.time_index()
+
+    score.append(parse_note('D4-4'))
+    score.items.append(parse_note('F4-8'))
+    assert score.time_index() is index
+    assert list(index.ticks) == \
+        list(TimeIndex(item.duration.length for item in score).ticks)
+
+
+def test_time_index_of_repeated_blocks():
+    items = operations.vertical_fold(make_items(), 2)
+    score = Score(items=items)
+    assert score.time_index().length() == \
+        sum(item.duration.length for item in items)
+    assert len(score.time_index()) == len(items)
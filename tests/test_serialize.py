@@ -0,0 +1,69 @@
+import pytest
+
+from notehole import serialize
+from notehole.music import (Score, PackedScore, Meter, Note, Rest, Chord, Tone,
+                            Duration)
+
+COLUMNS = ('kinds', 'values', 'dots', 'starts', 'pitches', 'accidentals')
+
+
+def make_score():
+    return Score(Meter(3, 8), 90.5, [
+        Note(Tone(28), Duration(4)),
+        Rest(Duration(8, 1)),
+        Chord({Tone(30), Tone(32, 1), Tone(26, -1)}, Duration(2)),
+        Note(Tone(-3, -1), Duration(16, 2)),
+        Chord({Tone(30)}, Duration(1)),
+        Note(Tone(28), Duration(4)),
+    ])
+
+
+@pytest.mark.parametrize('score', [make_score(), Score()])
+def test_round_trip(score):
+    reader = serialize.loads(serialize.dumps(score))
+    assert reader.meter == score.meter
+    assert reader.tempo == score.tempo
+    assert list(reader) == list(score)
+    assert [reader[i] for i in range(len(reader))] == list(score)
+
+
+@pytest.mark.parametrize('score', [make_score(), Score()])
+def test_packed_columns(score):
+    packed = PackedScore.from_score(score)
+    data = serialize.dumps(packed)
+    assert data == serialize.dumps(score)
+
+    decoded = serialize.loads(data).to_packed()
+    for name in COLUMNS:
+        assert getattr(decoded, name) == getattr(packed, name)
+    assert list(decoded) == list(score)
+
+
+def test_open_score(tmp_path):
+    filename = str(tmp_path / 'score.nhs')
+    with open(filename, 'wb') as f:
+        serialize.dump(make_score(), f)
+    reader = serialize.open_score(filename)
+    assert reader[2] == make_score().items[2]
+    assert reader.to_score().items == make_score().items
+
+
+@pytest.mark.parametrize('corrupt', [
+    lambda data: data[:10],
+    lambda data: b'NOPE' + data[4:],
+    lambda data: data[:4] + b'\x09\x00' + data[6:],
+    lambda data: data[:-1],
+])
+def test_invalid_data(corrupt):
+    with pytest.raises(ValueError):
+        serialize.loads(corrupt(serialize.dumps(make_score())))
+
+
+def test_invalid_record():
+    data = bytearray(serialize.dumps(make_score()))
+    data[serialize.HEADER.size] = 9
+    reader = serialize.loads(bytes(data))
+    with pytest.raises(ValueError):
+        reader.to_packed()
+    with pytest.raises(ValueError):
+        reader[0]
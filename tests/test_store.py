@@ -0,0 +1,113 @@
+import pytest
+
+from notehole.music import Meter
+from notehole.store import ScoreStore
+
+from conftest import make_score
+
+
+SCORES = [make_score(), make_score(('A3-1',), Meter(3, 4)),
+          make_score(('r-2', 'B4-2')), make_score(('D5-16',) * 8)]
+
+
+def same(a, b):
+    return (a.meter, a.tempo, list(a)) == (b.meter, b.tempo, list(b))
+
+
+def test_reader_sees_appends_after_refresh(tmp_path):
+    directory = str(tmp_path / 'store')
+    with ScoreStore(directory, writable=True) as writer:
+        writer.append(SCORES[0])
+        with ScoreStore(directory) as reader:
+            assert len(reader) == 1
+            assert writer.extend(SCORES[1:3]) == [1, 2]
+            assert len(reader) == 1
+            reader.refresh()
+            assert len(reader) == 3
+            assert same(reader.load(2), SCORES[2])
+            # an unknown id refreshes on its own
+            writer.append(SCORES[3])
+            assert same(reader.load(3), SCORES[3])
+            assert list(reader.ids()) == [0, 1, 2, 3]
+
+
+def test_delete(tmp_path):
+    directory = str(tmp_path / 'store')
+    with ScoreStore(directory, writable=True) as writer:
+        writer.extend(SCORES)
+        reader = ScoreStore(directory)
+        writer.delete(1)
+
+        for store in (writer, reader):
+            assert 1 not in store
+            assert 0 in store and 2 in store
+            assert 4 not in store and -1 not in store
+            with pytest.raises(KeyError):
+                store[1]
+            assert store.get(1) is None
+            assert list(store.ids()) == [0, 2, 3]
+            assert len(store) == 4
+        reader.close()
+
+
+def test_compact_keeps_ids(tmp_path):
+    directory = str(tmp_path / 'store')
+    with ScoreStore(directory, writable=True) as writer:
+        writer.extend(SCORES)
+        writer.delete(0)
+        writer.delete(2)
+        reader = ScoreStore(directory)
+        views = {score_id: reader[score_id] for score_id in (1, 3)}
+
+        writer.compact()
+        assert writer.generation == 1
+        assert sorted(p.name for p in (tmp_path / 'store').iterdir()) == \
+            ['.lock', 'CURRENT', 'data-1', 'index-1']
+
+        # views taken before keep reading the old generation
+        for score_id, view in views.items():
+            assert same(view.to_score(), SCORES[score_id])
+
+        reader.refresh()
+        assert reader.generation == 1
+        for store in (writer, reader):
+            assert list(store.ids()) == [1, 3]
+            assert same(store.load(1), SCORES[1])
+            assert same(store.load(3), SCORES[3])
+        assert writer.append(SCORES[0]) == 4
+        assert same(reader.load(4), SCORES[0])
+        reader.close()
+
+
+def test_single_writer(tmp_path):
+    directory = str(tmp_path / 'store')
+    with ScoreStore(directory, writable=True):
+        with pytest.raises(RuntimeError):
+            ScoreStore(directory, writable=True)
+        # readers never lock
+        ScoreStore(directory).close()
+    ScoreStore(directory, writable=True).close()
+
+
+def test_read_only(tmp_path):
+    directory = str(tmp_path / 'store')
+    ScoreStore(directory, writable=True).close()
+    with ScoreStore(directory) as reader:
+        assert len(reader) == 0
+        with pytest.raises(RuntimeError):
+            reader.append(SCORES[0])
+
+
+def test_reopen_and_append(tmp_path):
+    directory = str(tmp_path / 'store')
+    with ScoreStore(directory, writable=True) as writer:
+        writer.extend(SCORES[:2])
+        writer.delete(0)
+        writer.compact()
+
+    with ScoreStore(directory, writable=True) as writer:
+        assert writer.generation == 1
+        assert writer.extend(SCORES[2:]) == [2, 3]
+        assert list(writer.ids()) == [1, 2, 3]
+        for score_id, score in zip((1, 2, 3), writer.scores()):
+            assert same(score, SCORES[score_id])
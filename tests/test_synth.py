@@ -0,0 +1,85 @@
+import io
+import wave
+
+import pytest
+
+from notehole.export import Synthesizer, render_wav
+from notehole.export.synth import CHANNELS, RELEASE
+from notehole.music import Score
+
+from conftest import make_score
+
+numpy = pytest.importorskip('numpy')
+
+RATE = 8000
+
+
+class SineSynthesizer(Synthesizer):
+    # a plain sine for exactly the length of the note
+
+    def render_note(self, midi_note, frames):
+        frequency = 440.0 * 2 ** ((midi_note - 69) / 12)
+        t = numpy.arange(frames) / self.sample_rate
+        return (0.25 * numpy.sin(2 * numpy.pi * frequency * t)).astype(
+            numpy.float32)
+
+
+def render(synthesizer, score, **kwargs):
+    pcm = b''.join(synthesizer.stream(score, **kwargs))
+    samples = numpy.frombuffer(pcm, '<i2').reshape(-1, CHANNELS)
+    return samples[:, 0]
+
+
+def seconds(score):
+    # a quarter note lasts one beat
+    return float(score.length()) * 4 * 60 / score.tempo
+
+
+@pytest.mark.parametrize('tempo', [120, 70, 333])
+def test_frames_follow_length_and_tempo(tempo):
+    score = make_score(('r-4', 'A4-8', 'r-8', 'C5-4.', 'r-16'), tempo=tempo)
+    samples = render(SineSynthesizer(RATE), score, block=1000)
+    assert len(samples) == round(seconds(score) * RATE)
+
+    # silent until the first note, then the sine
+    beat = round(60 / tempo * RATE)
+    assert not samples[:beat].any()
+    assert samples[beat:beat + RATE // 100].any()
+
+
+def test_last_note_rings_out():
+    score = make_score()
+    samples = render(Synthesizer(RATE), score)
+    assert len(samples) == round(seconds(score) * RATE) + int(RELEASE * RATE)
+
+
+def test_empty_score():
+    synthesizer = Synthesizer(RATE)
+    assert list(synthesizer.stream(Score())) == []
+    with wave.open(io.BytesIO(render_wav(Score(), synthesizer))) as f:
+        assert f.getnframes() == 0
+
+
+def test_buffers_are_shared_across_renders():
+    synthesizer = SineSynthesizer(RATE)
+    score = make_score(('C4-4', 'C4-4', 'E4-8', 'C4-4'))
+    render(synthesizer, score)
+    first = synthesizer.cache_info()
+    assert (first.hits, first.misses) == (2, 2)
+
+    render(synthesizer, score)
+    second = synthesizer.cache_info()
+    assert second.misses == first.misses
+    assert second.hits == first.hits + 4
+
+
+def test_render_wav():
+    synthesizer = Synthesizer(RATE)
+    score = make_score()
+    data = render_wav(score, synthesizer)
+    with wave.open(io.BytesIO(data)) as f:
+        assert f.getnchannels() == CHANNELS
+        assert f.getsampwidth() == 2
+        assert f.getframerate() == RATE
+        frames = f.readframes(f.getnframes())
+    assert frames == b''.join(synthesizer.stream(score))
@@ -0,0 +1,45 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from notehole.util import bounded_submit, ordered_map
+
+
+def pulled(jobs, log):
+    for job in jobs:
+        log.append(job)
+        yield job
+
+
+def sleep_for(job):
+    time.sleep(job)
+    return job
+
+
+def test_bounded_submit_keeps_the_limit():
+    log = []
+    with ThreadPoolExecutor(2) as executor:
+        done = bounded_submit(executor, sleep_for, pulled([0.01] * 20, log), 4)
+        for count, (job, future) in enumerate(done, 1):
+            assert future.done() and future.result() == job
+            # the job just finished and at most `limit` pulled after it
+            assert len(log) <= count + 4
+    assert len(log) == 20
+
+
+def test_bounded_submit_order():
+    jobs = [0.2, 0.0, 0.1, 0.0]
+    with ThreadPoolExecutor(4) as executor:
+        ordered = [job for job, _ in
+                   bounded_submit(executor, sleep_for, jobs, 4)]
+        completed = [job for job, _ in
+                     bounded_submit(executor, sleep_for, jobs, 4,
+                                    ordered=False)]
+    assert ordered == jobs
+    assert completed[-1] == 0.2
+
+
+def test_ordered_map():
+    jobs = [0.02, 0.0, 0.01] * 3
+    assert list(ordered_map(sleep_for, jobs, workers=2)) == jobs
+    assert list(ordered_map(sleep_for, jobs, workers=1)) == jobs
@@ -0,0 +1,80 @@
+import random
+
+import pytest
+
+from notehole import operations, vectorized
+from notehole.music import Score, Tone, Note, Rest, Chord, Duration
+from notehole.music import pack_score
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+AXIS = Tone(34, 1)
+
+
+def random_score(length, seed):
+    rng = random.Random(seed)
+
+    def tone():
+        return Tone(rng.randint(14, 48), rng.randint(-2, 2))
+
+    items = []
+    for _ in range(length):
+        duration = Duration(rng.choice((1, 2, 4, 8, 16)), rng.randint(0, 2))
+        kind = rng.random()
+        if kind < 0.2:
+            items.append(Rest(duration))
+        elif kind < 0.3:
+            items.append(Note(operations.B_AXIS, duration))
+        elif kind < 0.35:
+            items.append(Note(AXIS, duration))
+        elif kind < 0.7:
+            items.append(Note(tone(), duration))
+        else:
+            # the axis and its mirror image may be part of the chord
+            tones = [tone() for _ in range(rng.randint(1, 4))]
+            tones += rng.choice(([], [operations.B_AXIS], [AXIS]))
+            items.append(Chord(tones, duration))
+    return Score(items=items)
+
+
+SCORES = [Score(), Score(items=[Rest(Duration(4))]),
+          Score(items=[Note(operations.B_AXIS, Duration(2))]),
+          Score(items=[Chord([operations.B_AXIS], Duration(1))])]
+SCORES += [random_score(length, seed)
+           for seed, length in enumerate((1, 2, 7, 50, 500))]
+
+OPERATIONS = [
+    operations.reverse,
+    operations.flip,
+    lambda items: operations.flip(items, AXIS),
+    operations.rotate_180,
+    operations.horizontal_fold,
+    lambda items: operations.horizontal_fold(items, AXIS),
+    operations.vertical_fold,
+    lambda items: operations.vertical_fold(items, 3),
+    operations.mobius_fold,
+    lambda items: operations.mobius_fold(items, 2),
+]
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    if request.param == 'numpy' and numpy is None:
+        pytest.skip('numpy is not installed')
+    if request.param == 'array':
+        monkeypatch.setattr(vectorized, 'numpy', None)
+    return request.param
+
+
+@pytest.mark.parametrize('operation', OPERATIONS)
+@pytest.mark.parametrize('score', SCORES)
+def test_packed_matches_items(backend, operation, score):
+    expected = list(operation(tuple(score)))
+    packed = operation(pack_score(score))
+    assert list(packed) == expected
+    assert len(packed) == len(expected)
+    # the result is a well formed score, ready for the next operation
+    assert list(operations.reverse(packed)) == expected[::-1]
@@ -0,0 +1,48 @@
+import io
+import sys
+import time
+
+import mido
+
+from bench_operations import random_score
+from notehole.export.midi import MidiExporter, MidiEncoder
+
+
+def encode_mido(score):
+    exporter = MidiExporter()
+    exporter.append(score)
+    mid = mido.MidiFile(type=exporter.FILETYPE, ticks_per_beat=exporter.TICK)
+    mid.tracks.append(exporter.track)
+    output = io.BytesIO()
+    mid.save(file=output)
+    return output.getvalue()
+
+
+def encode_native(score):
+    encoder = MidiEncoder()
+    encoder.append(score)
+    return encoder.to_bytes()
+
+
+def measure(function, score):
+    start = time.perf_counter()
+    result = function(score)
+    return time.perf_counter() - start, result
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    score = random_score(size)
+
+    mido_time, mido_bytes = measure(encode_mido, score)
+    native_time, native_bytes = measure(encode_native, score)
+
+    print('{} events, {} bytes, identical: {}'.format(
+        size, len(native_bytes), mido_bytes == native_bytes))
+    print('mido   {:8.3f}s'.format(mido_time))
+    print('native {:8.3f}s  x{:.1f}'.format(native_time,
+                                           mido_time / native_time))
+
+
+if __name__ == '__main__':
+    main()
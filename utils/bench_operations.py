@@ -0,0 +1,57 @@
+import random
+import sys
+import time
+
+from notehole import operations, vectorized
+from notehole.music import Score, PackedScore, Note, Chord, Rest, Tone, Duration
+
+
+def random_score(size, seed=0):
+    rand = random.Random(seed)
+    items = []
+    for _ in range(size):
+        duration = Duration(rand.choice((1, 2, 4, 8, 16)), rand.choice((0, 0, 1)))
+        kind = rand.random()
+        if kind < 0.15:
+            items.append(Rest(duration))
+        elif kind < 0.75:
+            items.append(Note(Tone(rand.randint(21, 48), rand.randint(-1, 1)),
+                              duration))
+        else:
+            tones = {Tone(rand.randint(21, 48)) for _ in range(3)}
+            items.append(Chord(tones, duration))
+    return Score(items=items)
+
+
+def measure(function, items):
+    start = time.perf_counter()
+    result = function(items)
+    if not isinstance(result, (tuple, PackedScore)):
+        result = tuple(result)
+    return time.perf_counter() - start
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    score = random_score(size)
+    packed = PackedScore.from_score(score)
+
+    print('{} events, batch backend: {}'.format(
+        size, 'numpy' if vectorized.numpy else 'array'))
+
+    benchmarks = (
+        ('flip', operations.flip),
+        ('horizontal_fold', operations.horizontal_fold),
+        ('rotate_180', operations.rotate_180),
+        ('mobius_fold', operations.mobius_fold),
+    )
+
+    for name, function in benchmarks:
+        objects = measure(function, score.items)
+        batch = measure(function, packed)
+        print('{:16} objects {:8.3f}s  batch {:8.3f}s  x{:.1f}'.format(
+            name, objects, batch, objects / batch))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import sys
+import time
+
+from ly.music import items
+
+from bench_operations import random_score
+from notehole.export.lilypond import LilypondExporter, TEMPLATE
+from notehole.parse.lilypond import (LilypondParser, FastLilypondParser,
+                                     NoteConverter, ChordConverter,
+                                     RestConverter)
+
+
+def lilypond_text(score):
+    exporter = LilypondExporter()
+    exporter.append(score)
+    start_tone = exporter.format_tone(exporter.start_tone,
+                                      exporter.start_tone.octave - 3)
+    return TEMPLATE.format(start_tone=start_tone,
+                           score=' '.join(exporter.tokens),
+                           extra='')
+
+
+def parse_full(text):
+    converters = {items.Note: NoteConverter(),
+                  items.Chord: ChordConverter(),
+                  items.Rest: RestConverter()}
+    return LilypondParser(converters).parse(text)
+
+
+def parse_fast(text):
+    return FastLilypondParser().parse(text)
+
+
+def measure(function, texts):
+    start = time.perf_counter()
+    results = [function(text) for text in texts]
+    return time.perf_counter() - start, results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    texts = [lilypond_text(random_score(size, seed)) for seed in range(count)]
+
+    full_time, full = measure(parse_full, texts)
+    fast_time, fast = measure(parse_fast, texts)
+
+    identical = [repr(a) for a in full] == [repr(b) for b in fast]
+    print('{} files of {} events, identical: {}'.format(count, size, identical))
+    print('python-ly {:8.3f}s  {:8.1f} files/s'.format(full_time,
+                                                       count / full_time))
+    print('fast      {:8.3f}s  {:8.1f} files/s  x{:.1f}'.format(
+        fast_time, count / fast_time, full_time / fast_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import gc
+import sys
+import time
+
+from bench_operations import random_score
+from bench_parse import lilypond_text
+from notehole import serialize
+from notehole.music import PackedScore
+from notehole.parse import parse_lilypond
+
+
+def measure(function, argument, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def dumps_cold(score):
+    # the item cache would otherwise be warm from the previous run
+    serialize.encode_item.cache_clear()
+    return serialize.dumps(score)
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    score = random_score(size)
+    packed = PackedScore.from_score(score)
+    text = lilypond_text(score)
+    data = serialize.dumps(score)
+
+    parse_time = measure(parse_lilypond, text, 3)
+    benchmarks = (
+        ('dumps(Score)', dumps_cold, score),
+        ('dumps(PackedScore)', serialize.dumps, packed),
+        ('loads().to_score()', lambda d: serialize.loads(d).to_score(), data),
+        ('loads().to_packed()', lambda d: serialize.loads(d).to_packed(),
+         data),
+    )
+
+    print('{} events, {} bytes, batch backend: {}'.format(
+        size, len(data), 'numpy' if serialize.numpy else 'items'))
+    print('{:20} {:8.3f}s'.format('parse_lilypond', parse_time))
+    for name, function, argument in benchmarks:
+        seconds = measure(function, argument)
+        print('{:20} {:8.3f}s  x{:.1f}'.format(name, seconds,
+                                               parse_time / seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import datetime
+import fnmatch
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from bench_operations import random_score
+from bench_parse import lilypond_text
+from notehole import operations, serialize, vectorized
+from notehole.export import midi
+from notehole.export.lilypond import LilypondExporter
+from notehole.music import PackedScore
+from notehole.parse import parse_lilypond
+
+SIZES = (1000, 100000, 1000000)
+THRESHOLD = 0.1
+
+OPERATIONS = (
+    ('reverse', operations.reverse),
+    ('flip', operations.flip),
+    ('rotate_180', operations.rotate_180),
+    ('vertical_fold', operations.vertical_fold),
+    ('horizontal_fold', operations.horizontal_fold),
+    ('mobius_fold', operations.mobius_fold),
+)
+
+
+def export_lilypond(score):
+    exporter = LilypondExporter()
+    exporter.append(score)
+    return ' '.join(exporter.tokens)
+
+
+def export_midi(score):
+    encoder = midi.MidiEncoder()
+    encoder.append(score)
+    return encoder.to_bytes()
+
+
+def export_mido(score):
+    exporter = midi.MidiExporter()
+    exporter.append(score)
+    return list(exporter.track)
+
+
+def materialize(function):
+    # lazy results are consumed, so that they are paid for where they are made
+    def run(argument):
+        result = function(argument)
+        if not isinstance(result, (tuple, list, bytes, str, PackedScore)):
+            result = tuple(result)
+        return result
+    return run
+
+
+def cases(size):
+    # (name, setup, function): setup builds the input outside the timings
+    score = lambda: random_score(size)
+    items = lambda: tuple(random_score(size).items)
+    packed = lambda: PackedScore.from_score(random_score(size))
+
+    yield 'parse_lilypond', lambda: lilypond_text(score()), parse_lilypond
+    for name, function in OPERATIONS:
+        yield 'operations.' + name, items, materialize(function)
+        yield 'operations.{}[packed]'.format(name), packed, \
+            materialize(function)
+    yield 'MidiEncoder', score, export_midi
+    if midi.mido is not None:
+        yield 'MidiExporter[mido]', score, export_mido
+    yield 'LilypondExporter', score, export_lilypond
+    yield 'serialize.dumps', score, serialize.dumps
+    yield 'serialize.dumps[packed]', packed, serialize.dumps
+    data = lambda: serialize.dumps(random_score(size))
+    yield 'serialize.to_score', data, \
+        lambda d: serialize.loads(d).to_score()
+    yield 'serialize.to_packed', data, \
+        lambda d: serialize.loads(d).to_packed()
+
+
+def measure(setup, function, size, repeat):
+    argument = setup()
+
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - start)
+
+    # a separate run, tracemalloc slows everything down
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function(argument)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    seconds = min(timings)
+    return {
+        'seconds': seconds,
+        'throughput': size / seconds if seconds else None,
+        'peak_bytes': peak,
+    }
+
+
+def run(sizes, pattern='*', repeat=3, report=print):
+    results = []
+    for size in sizes:
+        for name, setup, function in cases(size):
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            # one run is enough once a single one takes seconds
+            result = measure(setup, function, size,
+                             repeat if size < 1000000 else 1)
+            result.update(name=name, size=size)
+            results.append(result)
+            report(format_result(result))
+    return results
+
+
+def environment():
+    return {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': vectorized.numpy.__version__ if vectorized.numpy else None,
+        'mido': midi.mido is not None,
+    }
+
+
+def format_result(result):
+    return '{:34} {:>8} {:10.4f}s {:14,.0f} ev/s {:10.1f} MB'.format(
+        result['name'], result['size'], result['seconds'],
+        result['throughput'] or 0, result['peak_bytes'] / 1e6)
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    # returns the regressions: cases whose time or peak memory grew by more
+    # than `threshold` relative to the baseline
+    previous = {(r['name'], r['size']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        old = previous.get((result['name'], result['size']))
+        if old is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            if not old[metric]:
+                continue
+            change = result[metric] / old[metric] - 1
+            if change > threshold:
+                regressions.append((result['name'], result['size'], metric,
+                                    change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='notehole benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--only', default='*',
+                        help='glob on benchmark names, e.g. "operations.*"')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='save the results as JSON')
+    parser.add_argument('--compare', help='baseline JSON to compare with')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.only, args.repeat)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f,
+                      indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, size, metric, change in regressions:
+            print('REGRESSION {} {} {}: {:+.1%}'.format(name, size, metric,
+                                                       change))
+        if regressions:
+            sys.exit(1)
+        print('no regression above {:.0%}'.format(args.threshold))
+
+
+if __name__ == '__main__':
+    main()